@@ -10,43 +10,33 @@ Exemple:
 
 import sys
 import os
-import subprocess
+import importlib.util
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 import pandas as pd
 import cv2
+from scipy.signal import lfilter
 
 
-def get_video_rotation(video_path: str) -> int:
-    """Récupère la rotation de la vidéo via ffprobe."""
-    try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v", "quiet",
-                "-show_entries", "stream_side_data=rotation",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                video_path,
-            ],
-            capture_output=True,
-            text=True,
-        )
-        rotation_str = result.stdout.strip()
-        if rotation_str:
-            return int(float(rotation_str))
-    except Exception:
-        pass
-    return 0
+# Code cv2.rotate pour chaque rotation des métadonnées (résolu une seule fois)
+ROTATE_CODES = {
+    -90: cv2.ROTATE_90_CLOCKWISE,
+    270: cv2.ROTATE_90_CLOCKWISE,
+    90: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    -270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    180: cv2.ROTATE_180,
+    -180: cv2.ROTATE_180,
+}
 
 
 def rotate_frame(frame, rotation: int):
     """Applique la rotation à une frame selon les métadonnées vidéo."""
-    if rotation == -90 or rotation == 270:
-        return cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
-    elif rotation == 90 or rotation == -270:
-        return cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
-    elif rotation == 180 or rotation == -180:
-        return cv2.rotate(frame, cv2.ROTATE_180)
-    return frame
+    code = ROTATE_CODES.get(rotation)
+    if code is None:
+        return frame
+    return cv2.rotate(frame, code)
 
 
 # Configuration ArUco
@@ -68,6 +58,10 @@ for gate_num, (left_id, right_id) in GATES.items():
     TAG_TO_GATE[right_id] = (gate_num, "R")
 
 
+# Parseur CSV multithreadé de pyarrow s'il est installé (sinon parseur C de pandas)
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
 def load_calibration(folder: str) -> tuple[float, int]:
     """Charge calib.csv et retourne (sensor_start_time, video_start_frame)."""
     calib_path = os.path.join(folder, "calib.csv")
@@ -81,8 +75,8 @@ def load_sensor_data(folder: str) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Charge accel.csv et gyro.csv."""
     accel_path = os.path.join(folder, "accel.csv")
     gyro_path = os.path.join(folder, "gyro.csv")
-    accel_df = pd.read_csv(accel_path)
-    gyro_df = pd.read_csv(gyro_path)
+    accel_df = pd.read_csv(accel_path, engine=CSV_ENGINE)
+    gyro_df = pd.read_csv(gyro_path, engine=CSV_ENGINE)
     return accel_df, gyro_df
 
 
@@ -90,64 +84,329 @@ def load_motor_data(folder: str) -> pd.DataFrame | None:
     """Charge motor.csv s'il existe."""
     motor_path = os.path.join(folder, "motor.csv")
     if os.path.exists(motor_path):
-        return pd.read_csv(motor_path)
+        return pd.read_csv(motor_path, engine=CSV_ENGINE)
     return None
 
 
-def sync_sensor_to_frame(
-    frame_idx: int,
+def build_frame_sync_table(
+    times: np.ndarray,
+    frame_count: int,
     fps: float,
-    sensor_df: pd.DataFrame,
-    sensor_start: float,
     video_start_frame: int,
-) -> pd.Series | None:
-    """Retourne la ligne sensor la plus proche correspondant à la frame vidéo."""
-    video_time = (frame_idx - video_start_frame) / fps
-    sensor_time = sensor_start + video_time
+    time_offset: float = 0.0,
+) -> np.ndarray:
+    """
+    Précalcule pour chaque frame l'index de l'échantillon le plus proche dans times.
+
+    Le temps d'une frame est (frame_idx - video_start_frame) / fps + time_offset
+    (time_offset = sensor_start pour accel/gyro, 0 pour motor). Les frames dont
+    le temps est négatif valent -1.
+
+    Returns:
+        Tableau int32 de taille frame_count, indexé par numéro de frame
+    """
+    frame_times = (np.arange(frame_count) - video_start_frame) / fps + time_offset
+    idx = np.clip(np.searchsorted(times, frame_times), 1, len(times) - 1)
+    # Garder le voisin de gauche s'il est au moins aussi proche
+    idx -= (frame_times - times[idx - 1]) <= (times[idx] - frame_times)
+    idx[frame_times < 0] = -1
+    return idx.astype(np.int32)
+
+
+def build_imu_trajectory(
+    accel_for_frame: np.ndarray,
+    gyro_for_frame: np.ndarray,
+    accel_xyz: np.ndarray,
+    gyro_t: np.ndarray,
+    gyro_xyz: np.ndarray,
+    g: float = 9.81,
+    decay: float = 0.98,
+    max_dt: float = 0.1,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Intègre vitesse et orientation une seule fois pour toutes les frames.
+
+    Même intégration que frame par frame pendant la lecture (un pas entre deux
+    frames synchronisées consécutives, ignoré si dt <= 0 ou dt >= max_dt,
+    vitesse amortie de decay à chaque pas), mais indépendante de l'affichage:
+    un seek donne directement l'état de la frame visée.
+
+    Téléphone VERTICAL: Accel Z=avant, Y=gravité, X=latéral
+    Gyro: Y=yaw, X=pitch, Z=roll
+
+    Returns:
+        (velocity, orientation, steps) indexés par numéro de frame:
+        velocity[N, 3] en m/s, orientation[N, 3] = (roll, pitch, yaw) en rad,
+        steps[N] = nombre de pas d'intégration effectués jusqu'à la frame
+    """
+    frame_count = len(accel_for_frame)
+    # Le slot 0 n'est jamais affiché (CAP_PROP_POS_FRAMES vaut 1 après la
+    # première lecture): la première frame synchronisée affichée part de zéro
+    synced = (accel_for_frame >= 0) & (gyro_for_frame >= 0)
+    synced[:1] = False
+    valid = np.flatnonzero(synced)
+
+    t = gyro_t[gyro_for_frame[valid]]
+    dt = np.diff(t, prepend=t[:1])
+    step = (dt > 0) & (dt < max_dt)
+    dt = dt[step, None]
+
+    accel = accel_xyz[accel_for_frame[valid[step]]] * g
+    accel[:, 1] += g
+    gyro = gyro_xyz[gyro_for_frame[valid[step]]][:, [2, 0, 1]]
+
+    # v[k] = decay * (v[k-1] + a[k] * dt[k]): filtre récursif du premier ordre
+    velocity = lfilter([decay], [1.0, -decay], accel * dt, axis=0)
+    orientation = np.cumsum(gyro * dt, axis=0)
+
+    # Ligne 0 = état initial (aucun pas effectué), puis état après chaque pas
+    steps = np.zeros(frame_count, dtype=np.int64)
+    steps[valid[step]] = 1
+    steps = np.cumsum(steps)
+    velocity = np.vstack([np.zeros((1, 3)), velocity])[steps]
+    orientation = np.vstack([np.zeros((1, 3)), orientation])[steps]
+    return velocity, orientation, steps
+
+
+# Nombre de frames décodées gardées en mémoire pour les retours en arrière
+# (32 couvre un saut de -1s à 30 fps, ~200 Mo en 1080p)
+FRAME_BUFFER_SIZE = 32
+
+# Vignette grise utilisée pour détecter une scène immobile, et seuil
+# (écart absolu moyen par pixel) sous lequel la détection précédente est réutilisée
+MOTION_THUMB_SIZE = (90, 160)
+STATIC_MOTION_THRESHOLD = 0.5
+
+# Facteur de réduction appliqué avant la détection ArUco
+DETECTION_SCALE = 0.5
+
+# Transparent API OpenCV: avec des UMat, resize/cvtColor/détection passent sur
+# le GPU via OpenCL quand il est disponible (sinon on reste en NumPy)
+USE_OPENCL = cv2.ocl.haveOpenCL()
+cv2.ocl.setUseOpenCL(USE_OPENCL)
+
+
+# Buffers de travail de la détection, propres à chaque thread (la détection
+# tourne dans le worker de l'executor): réutilisés d'une frame à l'autre
+_detection_buffers = threading.local()
+
+
+def detection_buffer(name: str, shape: tuple) -> np.ndarray:
+    """Retourne le buffer uint8 name du thread courant, (ré)alloué si shape change."""
+    buf = getattr(_detection_buffers, name, None)
+    if buf is None or buf.shape != shape:
+        buf = np.empty(shape, dtype=np.uint8)
+        setattr(_detection_buffers, name, buf)
+    return buf
+
+
+def detect_aruco_markers(frame, detector, scale: float = DETECTION_SCALE) -> tuple:
+    """
+    Détecte les markers ArUco dans une frame.
+
+    La détection est faite sur une version réduite en niveaux de gris (le coût
+    du seuillage adaptatif est proportionnel au nombre de pixels), puis les
+    coins sont remis à l'échelle de la frame d'origine.
+
+    Le détecteur tourne sur toute l'image réduite: un pré-filtrage des
+    candidats (contours sur une image au quart puis détection sur chaque
+    recadrage) ne gagne que 10 à 25% de temps et perd des markers sur les
+    vidéos du circuit (jusqu'à un tiers selon le seuillage).
+    """
+    if USE_OPENCL:
+        frame = cv2.UMat(frame)
+        if scale != 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    else:
+        # Réduction et conversion écrites dans des buffers réutilisés:
+        # pas de nouvelle image allouée à chaque frame
+        if scale != 1.0:
+            height, width = frame.shape[:2]
+            size = (int(width * scale + 0.5), int(height * scale + 0.5))
+            small = detection_buffer("small", (size[1], size[0], 3))
+            frame = cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+        gray = detection_buffer("gray", frame.shape[:2])
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+    corners, ids, _ = detector.detectMarkers(gray)
+    if USE_OPENCL:
+        # Rapatrier uniquement les résultats (quelques points) en mémoire hôte
+        corners = tuple(c.get() for c in corners)
+        ids = ids.get()
+    if scale != 1.0:
+        corners = tuple(c / scale for c in corners)
+    return corners, ids
+
 
-    if sensor_time < 0:
+def read_frame(cap: cv2.VideoCapture, rotation: int) -> tuple[np.ndarray, int] | None:
+    """Lit la frame suivante et retourne (frame, frame_idx), ou None en fin de vidéo."""
+    ret, frame = cap.read()
+    if not ret:
         return None
+    return rotate_frame(frame, rotation), int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
+
+def read_and_detect(
+    cap: cv2.VideoCapture,
+    rotation: int,
+    executor: ThreadPoolExecutor,
+    detector,
+    previous: tuple | None = None,
+) -> tuple[np.ndarray, int, Future, np.ndarray] | None:
+    """
+    Lit la frame suivante et lance sa détection ArUco en arrière-plan.
+
+    OpenCV relâche le GIL pendant la détection: elle s'exécute donc en parallèle
+    du dessin des overlays et de l'affichage de la frame précédente.
+
+    Si previous est l'entrée de la frame précédente et que la scène n'a
+    quasiment pas bougé depuis la dernière détection réellement lancée, son
+    résultat est réutilisé au lieu de relancer le détecteur.
+
+    Returns:
+        (frame, frame_idx, detection, ref_thumb) ou None en fin de vidéo;
+        ref_thumb est la vignette de la frame sur laquelle detection a tourné
+    """
+    result = read_frame(cap, rotation)
+    if result is None:
+        return None
+    frame, frame_idx = result
+
+    small = cv2.resize(frame, MOTION_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    thumb = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    if previous is not None and previous[1] == frame_idx - 1:
+        _, _, detection, ref_thumb = previous
+        if cv2.norm(thumb, ref_thumb, cv2.NORM_L1) < STATIC_MOTION_THRESHOLD * thumb.size:
+            return frame, frame_idx, detection, ref_thumb
+
+    return frame, frame_idx, executor.submit(detect_aruco_markers, frame, detector), thumb
+
+
+def seek_frame(
+    cap: cv2.VideoCapture,
+    rotation: int,
+    executor: ThreadPoolExecutor,
+    detector,
+    target_idx: int,
+    recent_frames: deque,
+    max_forward: int,
+) -> tuple[np.ndarray, int, Future, np.ndarray] | None:
+    """
+    Retourne l'entrée (frame, frame_idx, detection, ref_thumb) de la frame target_idx.
+
+    cap.set(CAP_PROP_POS_FRAMES) force le décodeur à repartir de la keyframe
+    précédente, on l'évite autant que possible:
+    - frame récente encore dans recent_frames: aucun décodage
+    - cible à moins de max_forward frames devant le décodeur: lecture séquentielle
+    - sinon seulement: seek dans la vidéo
+
+    Les frames nouvellement décodées sont ajoutées à recent_frames.
+    """
+    for entry in recent_frames:
+        if entry[1] == target_idx:
+            return entry
+
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if position < target_idx <= position + max_forward:
+        for _ in range(target_idx - position - 1):
+            cap.grab()
+    else:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target_idx - 1)
 
-    idx = (sensor_df["seconds_elapsed"] - sensor_time).abs().idxmin()
-    return sensor_df.loc[idx]
+    previous = recent_frames[-1] if recent_frames else None
+    entry = read_and_detect(cap, rotation, executor, detector, previous)
+    if entry is not None:
+        recent_frames.append(entry)
+    return entry
 
 
-def sync_motor_to_frame(
-    frame_idx: int,
-    fps: float,
-    motor_df: pd.DataFrame,
-    video_start_frame: int,
-) -> pd.Series | None:
-    """Retourne la ligne motor la plus proche correspondant à la frame vidéo."""
-    video_time = (frame_idx - video_start_frame) / fps
+# Mise en page de l'interface
+HUD_LINE_HEIGHT = 22
+HUD_BOX_ALPHA = 0.6  # opacité du fond noir des panneaux
+IMU_BOX = (10, 10, 280, 280)  # (x1, y1, x2, y2) inclus
+MOTOR_BOX_WIDTH = 220
+HELP_TEXT = "ESPACE:Pause | Q:Quitter | R:Reset | Fleches:-/+1 frame | </>:-/+1s"
 
-    if video_time < 0:
-        return None
 
-    idx = (motor_df["seconds_elapsed"] - video_time).abs().idxmin()
-    return motor_df.loc[idx]
+def build_static_hud(width: int, height: int) -> list[tuple[int, int, np.ndarray, np.ndarray]]:
+    """
+    Pré-rend une seule fois les éléments fixes de l'interface.
 
+    Fonds semi-transparents des panneaux, titres et aide des contrôles sont
+    rastérisés au démarrage; chaque frame n'a plus qu'à les composer (voir
+    draw_static_hud) et à dessiner les valeurs qui changent.
 
-def detect_aruco_markers(frame, detector) -> tuple:
-    """Détecte les markers ArUco dans une frame."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    corners, ids, rejected = detector.detectMarkers(gray)
-    return corners, ids
+    Returns:
+        Liste de sprites (x, y, keep, add): la zone de la frame en (x, y)
+        devient roi * keep / 255 + add
+    """
+    layer = np.zeros((height, width, 3), dtype=np.uint8)
+    alpha = np.zeros((height, width), dtype=np.uint8)
+    box_alpha = round(HUD_BOX_ALPHA * 255)
+
+    def label(text: str, org: tuple[int, int], scale: float, color: tuple, thickness: int) -> None:
+        cv2.putText(layer, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        cv2.putText(alpha, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+
+    title_color = (255, 255, 255)
+    raw_color = (180, 180, 180)
+    regions = []
+
+    # Panneau IMU (coin supérieur gauche)
+    x1, y1, x2, y2 = IMU_BOX
+    alpha[y1:y2 + 1, x1:x2 + 1] = box_alpha
+    regions.append((x1, y1, x2 + 1, y2 + 1))
+    y = 35
+    label("VITESSE (IMU)", (20, y), 0.6, title_color, 2)
+    y += 4 * HUD_LINE_HEIGHT + 5
+    label("ORIENTATION", (20, y), 0.6, title_color, 2)
+    y += 4 * HUD_LINE_HEIGHT + 5
+    label("ACCEL (raw)", (20, y), 0.5, raw_color, 1)
+    y += 2 * HUD_LINE_HEIGHT
+    label("GYRO (raw)", (20, y), 0.5, raw_color, 1)
+
+    # Panneau moteur (coin supérieur droit)
+    box_x = width - MOTOR_BOX_WIDTH - 10
+    alpha[10:181, box_x:width - 9] = box_alpha
+    regions.append((box_x, 10, width - 9, 181))
+    label("MOTOR DATA", (box_x + 10, 35), 0.6, title_color, 2)
+
+    # Aide des contrôles (bas de l'écran)
+    (text_w, text_h), baseline = cv2.getTextSize(HELP_TEXT, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+    label(HELP_TEXT, (10, height - 15), 0.5, (200, 200, 200), 1)
+    regions.append((0, height - 15 - text_h - 2, min(width, 12 + text_w), height - 15 + baseline + 2))
+
+    # Le texte étant dessiné sur fond noir, layer est déjà prémultiplié par alpha
+    sprites = []
+    for x1, y1, x2, y2 in regions:
+        keep = cv2.cvtColor(255 - alpha[y1:y2, x1:x2], cv2.COLOR_GRAY2BGR)
+        sprites.append((x1, y1, keep, layer[y1:y2, x1:x2].copy()))
+    return sprites
+
+
+def draw_static_hud(frame, hud: list[tuple[int, int, np.ndarray, np.ndarray]]) -> np.ndarray:
+    """Compose (sur place) les sprites pré-rendus par build_static_hud."""
+    for x, y, keep, add in hud:
+        h, w = keep.shape[:2]
+        roi = frame[y:y + h, x:x + w]
+        roi[:] = cv2.add(cv2.multiply(roi, keep, scale=1 / 255), add)
+    return frame
 
 
 def draw_aruco_overlay(frame, corners, ids) -> np.ndarray:
-    """Dessine les markers détectés avec ID, cadre et info de porte."""
+    """Dessine (sur place) les markers détectés avec ID, cadre et info de porte."""
     if ids is None or len(ids) == 0:
         return frame
 
-    frame = frame.copy()
-    detected_gates = {}
+    # Tous les coins en un seul tableau (N, 4, 2): centres calculés en une
+    # opération et cadres dessinés en un seul appel à polylines
+    pts = np.concatenate(corners).astype(np.int32)
+    centers = pts.mean(axis=1).astype(int)
+    cv2.polylines(frame, list(pts), True, (0, 255, 0), 2)
 
-    for i, (corner, marker_id) in enumerate(zip(corners, ids.flatten())):
-        pts = corner[0].astype(int)
-        cv2.polylines(frame, [pts], True, (0, 255, 0), 2)
-        center = pts.mean(axis=0).astype(int)
+    detected_gates = {}
 
+    for center, marker_id in zip(centers, ids.flatten().tolist()):
         cv2.putText(
             frame, f"ID:{marker_id}",
             (center[0] - 20, center[1] - 10),
@@ -190,30 +449,26 @@ def draw_aruco_overlay(frame, corners, ids) -> np.ndarray:
     return frame
 
 
-def draw_motor_overlay(frame, motor_data: pd.Series | None) -> np.ndarray:
-    """Affiche les données moteur sur la frame (coin supérieur droit)."""
-    frame = frame.copy()
+def draw_motor_overlay(frame, motor_data: dict | None) -> np.ndarray:
+    """
+    Affiche (sur place) les données moteur sur la frame (coin supérieur droit).
+
+    Seules les valeurs sont dessinées ici: le fond et le titre du panneau
+    viennent de build_static_hud.
+    """
     w = frame.shape[1]
 
-    box_width = 220
+    box_width = MOTOR_BOX_WIDTH
     box_x = w - box_width - 10
 
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (box_x, 10), (w - 10, 180), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
-
-    title_color = (255, 255, 255)
     value_color = (0, 255, 150)
     bar_bg_color = (60, 60, 60)
     bar_speed_color = (0, 200, 100)
     bar_left_color = (255, 100, 100)
     bar_right_color = (100, 100, 255)
 
-    y = 35
-    line_height = 22
-
-    cv2.putText(frame, "MOTOR DATA", (box_x + 10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, title_color, 2)
-    y += line_height + 5
+    line_height = HUD_LINE_HEIGHT
+    y = 35 + line_height + 5
 
     if motor_data is None:
         cv2.putText(frame, "No data", (box_x + 20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 100, 100), 1)
@@ -261,61 +516,41 @@ def draw_imu_overlay(
     accel: tuple[float, float, float] | None,
     gyro: tuple[float, float, float] | None,
 ) -> np.ndarray:
-    """Affiche les données IMU sur la frame."""
-    frame = frame.copy()
+    """
+    Affiche (sur place) les valeurs IMU sur la frame.
 
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (10, 10), (280, 280), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
-
-    title_color = (255, 255, 255)
+    Le fond et les titres du panneau viennent de build_static_hud.
+    """
     value_color = (0, 255, 255)
     raw_color = (180, 180, 180)
 
-    y = 35
-    line_height = 22
+    line_height = HUD_LINE_HEIGHT
+    y = 35 + line_height
 
-    cv2.putText(frame, "VITESSE (IMU)", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, title_color, 2)
-    y += line_height
     cv2.putText(frame, f"Vx: {velocity[0]:+.2f} m/s", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, value_color, 1)
     y += line_height
     cv2.putText(frame, f"Vy: {velocity[1]:+.2f} m/s", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, value_color, 1)
     y += line_height
     cv2.putText(frame, f"Vz: {velocity[2]:+.2f} m/s", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, value_color, 1)
-    y += line_height + 5
+    y += 2 * line_height + 5
 
-    cv2.putText(frame, "ORIENTATION", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, title_color, 2)
-    y += line_height
     cv2.putText(frame, f"Roll:  {np.degrees(orientation[0]):+.1f} deg", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, value_color, 1)
     y += line_height
     cv2.putText(frame, f"Pitch: {np.degrees(orientation[1]):+.1f} deg", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, value_color, 1)
     y += line_height
     cv2.putText(frame, f"Yaw:   {np.degrees(orientation[2]):+.1f} deg", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, value_color, 1)
-    y += line_height + 5
+    y += 2 * line_height + 5
 
     if accel is not None:
-        cv2.putText(frame, "ACCEL (raw)", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, raw_color, 1)
-        y += line_height
         cv2.putText(frame, f"X:{accel[0]:+.2f}g Y:{accel[1]:+.2f}g Z:{accel[2]:+.2f}g", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.4, raw_color, 1)
-        y += line_height
+    y += 2 * line_height
 
     if gyro is not None:
-        cv2.putText(frame, "GYRO (raw)", (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, raw_color, 1)
-        y += line_height
         cv2.putText(frame, f"X:{gyro[0]:+.2f} Y:{gyro[1]:+.2f} Z:{gyro[2]:+.2f} rad/s", (30, y), cv2.FONT_HERSHEY_SIMPLEX, 0.4, raw_color, 1)
 
     return frame
 
 
-def draw_controls_help(frame) -> np.ndarray:
-    """Affiche l'aide des contrôles en bas de l'écran."""
-    frame = frame.copy()
-    h = frame.shape[0]
-    help_text = "ESPACE:Pause | Q:Quitter | R:Reset | Fleches:-/+1 frame | </>:-/+1s"
-    cv2.putText(frame, help_text, (10, h - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-    return frame
-
-
 def main() -> None:
     """Boucle principale: lecture vidéo + overlay + display."""
     if len(sys.argv) < 2:
@@ -351,93 +586,138 @@ def main() -> None:
         print(f"Erreur: impossible d'ouvrir la vidéo '{video_path}'")
         sys.exit(1)
 
+    # Rotation lue dans les métadonnées par OpenCV (pas de sous-process ffprobe)
+    # et appliquée par rotate_frame, l'auto-rotation du backend étant désactivée
+    orientation = int(cap.get(cv2.CAP_PROP_ORIENTATION_META))
+    if orientation and cap.set(cv2.CAP_PROP_ORIENTATION_AUTO, 0):
+        rotation = -orientation  # 90 (sens horaire) correspond à -90 chez ffprobe
+    else:
+        rotation = 0  # le backend tourne déjà les frames (ou rien à tourner)
+
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-    rotation = get_video_rotation(video_path)
     if rotation in (-90, 90, 270, -270):
         width, height = height, width
     print(f"  - Vidéo: {width}x{height}, {fps:.2f} fps, {total_frames} frames, rotation={rotation}°")
 
+    # Colonnes extraites une fois en tableaux NumPy contigus: la boucle
+    # n'indexe plus que des tableaux (pas de pd.Series créée par frame)
+    accel_t = accel_df["seconds_elapsed"].to_numpy(dtype=np.float64)
+    accel_xyz = np.ascontiguousarray(accel_df[["x", "y", "z"]].to_numpy(dtype=np.float64))
+    gyro_t = gyro_df["seconds_elapsed"].to_numpy(dtype=np.float64)
+    gyro_xyz = np.ascontiguousarray(gyro_df[["x", "y", "z"]].to_numpy(dtype=np.float64))
+
+    # Index de l'échantillon le plus proche précalculé pour chaque frame
+    # (frame_idx va de 0 à total_frames inclus)
+    frame_count = total_frames + 1
+    accel_for_frame = build_frame_sync_table(accel_t, frame_count, fps, video_start_frame, sensor_start)
+    gyro_for_frame = build_frame_sync_table(gyro_t, frame_count, fps, video_start_frame, sensor_start)
+    motor_for_frame = None
+    motor_rows = None
+    if motor_df is not None:
+        motor_t = motor_df["seconds_elapsed"].to_numpy(dtype=np.float64)
+        motor_for_frame = build_frame_sync_table(motor_t, frame_count, fps, video_start_frame)
+        motor_rows = motor_df.to_dict("records")
+
     aruco_dict = cv2.aruco.getPredefinedDictionary(ARUCO_DICT)
     aruco_params = cv2.aruco.DetectorParameters()
+    # Pas de raffinement sous-pixel des coins: le viewer ne s'en sert que pour
+    # dessiner des cadres en pixels entiers
+    aruco_params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_NONE
     detector = cv2.aruco.ArucoDetector(aruco_dict, aruco_params)
 
-    velocity = np.array([0.0, 0.0, 0.0])
-    orientation = np.array([0.0, 0.0, 0.0])
-    last_sensor_time = None
-    g = 9.81
+    # Trajectoire IMU précalculée pour toutes les frames; un reset ne fait que
+    # mémoriser la frame de référence dont l'état est retranché à l'affichage
+    imu_decay = 0.98
+    frame_velocity, frame_orientation, imu_steps = build_imu_trajectory(
+        accel_for_frame, gyro_for_frame, accel_xyz, gyro_t, gyro_xyz, decay=imu_decay,
+    )
+    imu_synced = (accel_for_frame >= 0) & (gyro_for_frame >= 0)
+    reset_frame = None
+    reset_anchor = None
 
     paused = False
     frame_idx = 0
 
+    # Un seul worker: la détection de la frame N+1 tourne pendant qu'on dessine
+    # la frame N (le détecteur n'est jamais utilisé par deux threads à la fois)
+    executor = ThreadPoolExecutor(max_workers=1)
+    # Buffer circulaire des entrées (frame, frame_idx, detection, ref_thumb) récentes
+    recent_frames = deque(maxlen=FRAME_BUFFER_SIZE)
+    max_forward = max(1, int(fps))
+
     print("\nDémarrage de la lecture...")
     print("Contrôles: ESPACE=Pause, Q=Quitter, R=Reset, Fleches=-/+1 frame, </>=-/+1s")
 
+    hud = build_static_hud(width, height)
+
     cv2.namedWindow("AR Viewer", cv2.WINDOW_NORMAL)
 
+    dirty = True
     while True:
         if not paused:
-            ret, frame = cap.read()
-            if not ret:
+            entry = seek_frame(cap, rotation, executor, detector, frame_idx + 1, recent_frames, max_forward)
+            if entry is None:
                 print("Fin de la vidéo")
                 break
-            frame = rotate_frame(frame, rotation)
-            frame_idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
-
-        accel_row = sync_sensor_to_frame(frame_idx, fps, accel_df, sensor_start, video_start_frame)
-        gyro_row = sync_sensor_to_frame(frame_idx, fps, gyro_df, sensor_start, video_start_frame)
-
-        motor_row = None
-        if motor_df is not None:
-            motor_row = sync_motor_to_frame(frame_idx, fps, motor_df, video_start_frame)
-
-        accel = None
-        gyro = None
-
-        if accel_row is not None:
-            accel = (accel_row["x"], accel_row["y"], accel_row["z"])
-
-        if gyro_row is not None:
-            gyro = (gyro_row["x"], gyro_row["y"], gyro_row["z"])
-
-        # Intégration IMU
-        # Téléphone VERTICAL: Accel Z=avant, Y=gravité, X=latéral
-        # Gyro: Y=yaw, X=pitch, Z=roll
-        if accel_row is not None and gyro_row is not None:
-            current_time = gyro_row["seconds_elapsed"]
-            if last_sensor_time is not None:
-                dt = current_time - last_sensor_time
-                if dt > 0 and dt < 0.1:
-                    accel_corrected = np.array([
-                        accel_row["x"] * g,
-                        (accel_row["y"] + 1) * g,
-                        accel_row["z"] * g,
-                    ])
-                    velocity += accel_corrected * dt
-                    velocity *= 0.98
-
-                    orientation[0] += gyro_row["z"] * dt  # roll
-                    orientation[1] += gyro_row["x"] * dt  # pitch
-                    orientation[2] += gyro_row["y"] * dt  # yaw
-
-            last_sensor_time = current_time
-
-        corners, ids = detect_aruco_markers(frame, detector)
-
-        frame = draw_aruco_overlay(frame, corners, ids)
-        frame = draw_imu_overlay(frame, tuple(velocity), tuple(orientation), accel, gyro)
-        frame = draw_motor_overlay(frame, motor_row)
-        frame = draw_controls_help(frame)
-
-        cv2.putText(frame, f"Frame: {frame_idx}/{total_frames}", (width - 180, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-        if paused:
-            cv2.putText(frame, "PAUSE", (width // 2 - 50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
-
-        cv2.imshow("AR Viewer", frame)
+            frame, frame_idx, detection, _ = entry
+            # Lecture anticipée: la frame suivante est décodée et sa détection
+            # lancée pendant le rendu de celle-ci (elle attend dans recent_frames)
+            seek_frame(cap, rotation, executor, detector, frame_idx + 1, recent_frames, max_forward)
+            dirty = True
+
+        # En pause, rien ne change tant qu'aucune touche n'a modifié l'état:
+        # overlays et imshow ne sont relancés que si l'image doit changer
+        if dirty:
+            sync_slot = min(frame_idx, total_frames)
+            accel_idx = accel_for_frame[sync_slot]
+            gyro_idx = gyro_for_frame[sync_slot]
+
+            motor_row = None
+            if motor_rows is not None:
+                motor_idx = motor_for_frame[sync_slot]
+                if motor_idx >= 0:
+                    motor_row = motor_rows[motor_idx]
+
+            accel = None
+            gyro = None
+
+            if accel_idx >= 0:
+                accel = tuple(accel_xyz[accel_idx].tolist())
+
+            if gyro_idx >= 0:
+                gyro = tuple(gyro_xyz[gyro_idx].tolist())
+
+            velocity = frame_velocity[sync_slot]
+            orientation = frame_orientation[sync_slot]
+            if reset_frame is not None and sync_slot >= reset_frame:
+                if sync_slot < reset_anchor:
+                    velocity = np.zeros(3)
+                    orientation = np.zeros(3)
+                else:
+                    elapsed_steps = imu_steps[sync_slot] - imu_steps[reset_anchor]
+                    velocity = velocity - imu_decay ** elapsed_steps * frame_velocity[reset_anchor]
+                    orientation = orientation - frame_orientation[reset_anchor]
+
+            corners, ids = detection.result()
+
+            # Une seule copie par rendu: les overlays dessinent sur place dans
+            # canvas, la frame décodée reste intacte (elle est redessinée en pause)
+            canvas = frame.copy()
+            draw_aruco_overlay(canvas, corners, ids)
+            draw_static_hud(canvas, hud)
+            draw_imu_overlay(canvas, tuple(velocity.tolist()), tuple(orientation.tolist()), accel, gyro)
+            draw_motor_overlay(canvas, motor_row)
+
+            cv2.putText(canvas, f"Frame: {frame_idx}/{total_frames}", (width - 180, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+            if paused:
+                cv2.putText(canvas, "PAUSE", (width // 2 - 50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 3)
+
+            cv2.imshow("AR Viewer", canvas)
+            dirty = False
 
         key = cv2.waitKey(1 if not paused else 50) & 0xFF
 
@@ -445,40 +725,36 @@ def main() -> None:
             break
         elif key == ord(" "):
             paused = not paused
+            dirty = True
         elif key == ord("r"):
-            velocity = np.array([0.0, 0.0, 0.0])
-            orientation = np.array([0.0, 0.0, 0.0])
-            last_sensor_time = None
+            reset_frame = min(frame_idx, total_frames)
+            # Le temps capteur précédent est oublié au reset: la première frame
+            # synchronisée traitée ensuite ne fait pas de pas, l'intégration
+            # repart de son état (reset_anchor). En pause la frame courante est
+            # retraitée, en lecture c'est la suivante.
+            first = reset_frame if paused else reset_frame + 1
+            synced_after = np.flatnonzero(imu_synced[first:])
+            reset_anchor = first + int(synced_after[0]) if len(synced_after) else total_frames + 1
+            dirty = True
             print("Reset de la vitesse et de l'orientation")
-        elif key == ord(","):
-            new_frame = max(0, frame_idx - int(fps))
-            cap.set(cv2.CAP_PROP_POS_FRAMES, new_frame)
-            ret, frame = cap.read()
-            if ret:
-                frame = rotate_frame(frame, rotation)
-            frame_idx = new_frame
-        elif key == ord("."):
-            new_frame = min(total_frames - 1, frame_idx + int(fps))
-            cap.set(cv2.CAP_PROP_POS_FRAMES, new_frame)
-            ret, frame = cap.read()
-            if ret:
-                frame = rotate_frame(frame, rotation)
-            frame_idx = new_frame
-        elif key == 81 or key == 2:  # Flèche gauche
-            new_frame = max(0, frame_idx - 1)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, new_frame)
-            ret, frame = cap.read()
-            if ret:
-                frame = rotate_frame(frame, rotation)
-            frame_idx = new_frame
-        elif key == 83 or key == 3:  # Flèche droite
-            new_frame = min(total_frames - 1, frame_idx + 1)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, new_frame)
-            ret, frame = cap.read()
-            if ret:
-                frame = rotate_frame(frame, rotation)
-            frame_idx = new_frame
-
+        else:
+            new_frame = None
+            if key == ord(","):
+                new_frame = max(1, frame_idx - int(fps))
+            elif key == ord("."):
+                new_frame = min(total_frames, frame_idx + int(fps))
+            elif key == 81 or key == 2:  # Flèche gauche
+                new_frame = max(1, frame_idx - 1)
+            elif key == 83 or key == 3:  # Flèche droite
+                new_frame = min(total_frames, frame_idx + 1)
+
+            if new_frame is not None and new_frame != frame_idx:
+                entry = seek_frame(cap, rotation, executor, detector, new_frame, recent_frames, max_forward)
+                if entry is not None:
+                    frame, frame_idx, detection, _ = entry
+                    dirty = True
+
+    executor.shutdown(cancel_futures=True)
     cap.release()
     cv2.destroyAllWindows()
     print("Terminé.")
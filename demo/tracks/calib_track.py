@@ -1,34 +1,30 @@
 import sys
 import pandas as pd
 import numpy as np
-from scipy.signal import find_peaks, butter, filtfilt
+from scipy.signal import find_peaks, butter, sosfiltfilt
 import cv2
 import os
+import subprocess
 
 def build_sensor_start_time(file: str):
     df = pd.read_csv(file)
 
     # ---------- 2️⃣ Calculer la magnitude ----------
-    df['gyro_mag'] = np.sqrt(df['x']**2 + df['y']**2 + df['z']**2)
+    xyz = df[['x', 'y', 'z']].to_numpy(dtype=np.float64)
+    gyro_mag = np.linalg.norm(xyz, axis=1)
 
     # ---------- 3️⃣ Filtrer pour lisser le signal ----------
-    def butter_lowpass(cutoff, fs, order=4):
-        from scipy.signal import butter
-        nyq = 0.5 * fs
-        normal_cutoff = cutoff / nyq
-        b, a = butter(order, normal_cutoff, btype='low', analog=False)
-        return b, a
-
+    # Sections du second ordre (SOS): plus stable numériquement que (b, a)
     fs = 100  # fréquence approx en Hz
     cutoff = 5  # Hz
-    b, a = butter_lowpass(cutoff, fs)
-    df['gyro_filt'] = filtfilt(b, a, df['gyro_mag'])
+    sos = butter(4, cutoff / (0.5 * fs), btype='low', output='sos')
+    gyro_filt = sosfiltfilt(sos, gyro_mag)
 
     # ---------- 4️⃣ Dérivée pour détecter les mouvements brusques ----------
-    df['gyro_diff'] = np.abs(np.diff(df['gyro_filt'], prepend=df['gyro_filt'][0]))
+    gyro_diff = np.abs(np.diff(gyro_filt, prepend=gyro_filt[0]))
 
     # ---------- 5️⃣ Détecter tous les pics ----------
-    peaks, properties = find_peaks(df['gyro_diff'], height=0.1, distance=20)  # height > 0.1
+    peaks, properties = find_peaks(gyro_diff, height=0.1, distance=20)  # height > 0.1
 
     if len(peaks) == 0:
         raise Exception("Aucun pic significatif détecté")
@@ -37,60 +33,166 @@ def build_sensor_start_time(file: str):
         start_time = df['seconds_elapsed'].iloc[first_peak_idx]
         return start_time
 
+# Largeur de l'image réduite utilisée pour mesurer le mouvement entre frames
+MOTION_WIDTH = 320
+
+# Nombre de deltas calculés d'un bloc (vectorisé) lors de la recherche du tap
+MOTION_BATCH = 32
+
+
+def read_gray_frames_opencv(file: str, start_frame: int, size: tuple[int, int]):
+    """
+    Lit la vidéo via OpenCV à partir de start_frame, en gris à la taille size.
+
+    La frame renvoyée est un buffer réutilisé: elle est écrasée à l'itération suivante.
+    """
+    width, height = size
+    small = np.empty((height, width, 3), dtype=np.uint8)
+    gray = np.empty((height, width), dtype=np.uint8)
+    cap = cv2.VideoCapture(file)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=gray)
+            yield gray
+    finally:
+        cap.release()
+
+
+def read_gray_frames(file: str, start_frame: int, fps: float, size: tuple[int, int]):
+    """
+    Lit la vidéo à partir de start_frame, en niveaux de gris à la taille size.
+
+    ffmpeg décode, réduit et convertit en gris directement dans un pipe
+    rawvideo: pas de passage par une frame BGR pleine résolution.
+    Si ffmpeg n'est pas installé, ou échoue avant la première frame (version,
+    codec, seek), on retombe sur OpenCV.
+
+    La frame renvoyée est un buffer réutilisé: elle est écrasée à l'itération suivante.
+    """
+    width, height = size
+    # -ss avant -i: seek précis, on vise le milieu de l'intervalle précédant la frame
+    start_time = max(0.0, (start_frame - 0.5) / fps)
+    try:
+        proc = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-v", "error",
+                "-ss", f"{start_time:.6f}",
+                "-i", file,
+                "-vf", f"scale={width}:{height}:flags=area",
+                # une image par frame décodée (pas de duplication); ffmpeg < 5.1
+                # refuse -fps_mode et échoue: on retombe alors sur OpenCV
+                "-fps_mode", "passthrough",
+                "-f", "rawvideo",
+                "-pix_fmt", "gray",
+                "pipe:",
+            ],
+            stdout=subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        yield from read_gray_frames_opencv(file, start_frame, size)
+        return
+
+    # Lecture du pipe directement dans un buffer fixe (pas de bytes alloué par frame)
+    gray = np.empty((height, width), dtype=np.uint8)
+    frame_bytes = gray.nbytes
+    data = memoryview(gray).cast("B")
+    frames_read = 0
+    try:
+        while True:
+            if proc.stdout.readinto(data) < frame_bytes:
+                break
+            frames_read += 1
+            yield gray
+        if frames_read == 0 and proc.wait() != 0:
+            # ffmpeg présent mais en erreur: décoder avec OpenCV
+            yield from read_gray_frames_opencv(file, start_frame, size)
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def batch_motion(frames: np.ndarray) -> np.ndarray:
+    """
+    Delta absolu moyen entre frames consécutives d'un bloc uint8[N, h, w].
+
+    Returns:
+        Tableau de taille N-1: motion[k] = delta entre les frames k et k+1
+    """
+    diff = np.abs(np.diff(frames.astype(np.int16), axis=0))
+    return diff.mean(axis=(1, 2))
+
+
+def first_motion_peak(frames: np.ndarray, threshold: float) -> int | None:
+    """Retourne l'index (dans frames) de la première frame dont le delta dépasse threshold."""
+    over = np.flatnonzero(batch_motion(frames) > threshold)
+    if len(over) == 0:
+        return None
+    return int(over[0]) + 1
+
+
 def build_video_start_frame(file: str):
     gyro_peak_time = 0.14529      # temps du pic détecté dans le gyro (en secondes)
     fps = None                    # on récupérera automatiquement
 
+    # seuil de détection du tap (à ajuster si nécessaire)
+    motion_threshold = 10  # valeur moyenne des pixels qui correspond au tap
+
     # --- INITIALISATION ---
     cap = cv2.VideoCapture(file)
     if not cap.isOpened():
         raise Exception("Impossible d'ouvrir la vidéo")
 
     fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
-    prev_frame_gray = None
-    motion_values = []
-
-    # --- ANALYSE FRAME PAR FRAME ---
-    for i in range(total_frames):
-        ret, frame = cap.read()
-        if not ret:
-            break
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        if prev_frame_gray is not None:
-            # delta absolu moyen entre frames consécutives
-            diff = cv2.absdiff(gray, prev_frame_gray)
-            motion = np.mean(diff)
-            motion_values.append((i, motion))
-        prev_frame_gray = gray
-
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     cap.release()
+    # La moyenne du delta absolu est robuste à la réduction de résolution
+    motion_size = (MOTION_WIDTH, max(1, height * MOTION_WIDTH // width))
 
-    # --- DETECTION DU PIC DE MOUVEMENT ---
-    motion_array = np.array([m[1] for m in motion_values])
-    frame_array = np.array([m[0] for m in motion_values])
-
-    # seuil de détection du tap (à ajuster si nécessaire)
-    motion_threshold = 10  # valeur moyenne des pixels qui correspond au tap
-
-    # détecte toutes les frames où le mouvement dépasse le seuil
-    motion_peaks = frame_array[motion_array > motion_threshold]
-    motion_values_over = motion_array[motion_array > motion_threshold]
+    # Seules les frames après le pic gyro nous intéressent: on démarre
+    # juste avant (il faut la frame précédente pour le delta)
+    first_frame = max(1, int(np.ceil(gyro_peak_time * fps)))
 
-    # On prend la première frame après le temps du pic gyro
     frame_start = None
-    for f, m in zip(motion_peaks, motion_values_over):
-        frame_time = f / fps
-        if frame_time >= gyro_peak_time:
-            frame_start = f
-            return frame_start
+
+    # --- ANALYSE PAR BLOCS DE FRAMES, ARRÊT AU PREMIER PIC DE MOUVEMENT ---
+    # batch[0] est la dernière frame du bloc précédent (référence du premier delta)
+    batch = np.empty((MOTION_BATCH + 1, motion_size[1], motion_size[0]), dtype=np.uint8)
+    batch_first = first_frame - 1  # numéro de la frame batch[0]
+    count = 0
+    frames = read_gray_frames(file, first_frame - 1, fps, motion_size)
+    for gray in frames:
+        batch[count] = gray
+        count += 1
+        if count < len(batch):
+            continue
+        peak = first_motion_peak(batch, motion_threshold)
+        if peak is not None:
+            frame_start = batch_first + peak
+            break
+        batch[0] = batch[-1]
+        batch_first += MOTION_BATCH
+        count = 1
+    else:
+        # Dernier bloc incomplet (fin de vidéo)
+        if count > 1:
+            peak = first_motion_peak(batch[:count], motion_threshold)
+            if peak is not None:
+                frame_start = batch_first + peak
+    frames.close()
 
     if frame_start is None:
         raise Exception("Aucune frame correspondante au pic gyro n'a été trouvée. Ajuste le seuil.")
-    
-    
+
+    return frame_start
+
+
 def main() -> None:
     """Main entry point."""
     folder = sys.argv[1]
@@ -22,9 +22,11 @@ Sortie:
 
 import sys
 import os
+import importlib.util
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-from scipy.signal import butter, filtfilt
+from scipy.signal import butter, sosfiltfilt, lfilter
 
 
 # Constantes physiques
@@ -38,29 +40,42 @@ MAX_TURN_RATE = 2.0  # rad/s - taux de rotation max attendu pour normaliser à 1
 # Vitesse max attendue pour normaliser à 100%
 MAX_SPEED_MS = 5.0  # m/s (environ 18 km/h, raisonnable pour un kart)
 
+# Type des échantillons bruts accel/gyro: float32 suffit à leur précision.
+# Les temps, les intégrations (cumsum, vitesse) et les filtres restent en float64.
+SAMPLE_DTYPE = np.float32
 
-def butter_lowpass_filter(data: np.ndarray, cutoff: float, fs: float, order: int = 4) -> np.ndarray:
-    """Applique un filtre passe-bas Butterworth."""
+# Parseur CSV multithreadé de pyarrow s'il est installé (sinon parseur C de pandas)
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
+@lru_cache(maxsize=32)
+def butter_sos(cutoff: float, fs: float, order: int, btype: str) -> np.ndarray:
+    """
+    Filtre Butterworth en sections du second ordre (SOS), calculé une seule fois par réglage.
+
+    La forme SOS est numériquement plus stable que (b, a) pour les coupures basses.
+    """
     nyq = 0.5 * fs
     normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='low', analog=False)
-    return filtfilt(b, a, data)
+    return butter(order, normal_cutoff, btype=btype, analog=False, output='sos')
+
+
+def butter_lowpass_filter(data: np.ndarray, cutoff: float, fs: float, order: int = 4) -> np.ndarray:
+    """Applique un filtre passe-bas Butterworth."""
+    return sosfiltfilt(butter_sos(cutoff, fs, order, 'low'), data)
 
 
 def butter_highpass_filter(data: np.ndarray, cutoff: float, fs: float, order: int = 4) -> np.ndarray:
     """Applique un filtre passe-haut Butterworth pour retirer la dérive."""
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='high', analog=False)
-    return filtfilt(b, a, data)
+    return sosfiltfilt(butter_sos(cutoff, fs, order, 'high'), data)
 
 
 def load_sensor_data(folder: str) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Charge accel.csv et gyro.csv."""
     accel_path = os.path.join(folder, "accel.csv")
     gyro_path = os.path.join(folder, "gyro.csv")
-    accel_df = pd.read_csv(accel_path)
-    gyro_df = pd.read_csv(gyro_path)
+    accel_df = pd.read_csv(accel_path, engine=CSV_ENGINE)
+    gyro_df = pd.read_csv(gyro_path, engine=CSV_ENGINE)
     return accel_df, gyro_df
 
 
@@ -73,6 +88,36 @@ def load_calibration(folder: str) -> tuple[float, int]:
     return sensor_start, video_start_frame
 
 
+def rolling_variance(data: np.ndarray, window: int) -> np.ndarray:
+    """
+    Variance de chaque fenêtre data[i-window:i] pour i de window à len(data) - 1.
+
+    Calculée en une passe via les sommes cumulées de x et x² (Var = E[x²] - E[x]²),
+    sur les données centrées pour limiter les erreurs d'arrondi.
+    """
+    centered = data - data.mean()
+    s1 = np.concatenate(([0.0], np.cumsum(centered, dtype=np.float64)))
+    s2 = np.concatenate(([0.0], np.cumsum(np.square(centered, dtype=np.float64))))
+    win_sum = s1[window:-1] - s1[:-window - 1]
+    win_sum2 = s2[window:-1] - s2[:-window - 1]
+    return win_sum2 / window - (win_sum / window) ** 2
+
+
+def interp_columns(x: np.ndarray, xp: np.ndarray, fp: np.ndarray) -> np.ndarray:
+    """
+    Interpolation linéaire de toutes les colonnes de fp (N, k) aux points x.
+
+    Même résultat que np.interp colonne par colonne (valeurs extrêmes hors de xp),
+    mais la recherche des intervalles dans xp n'est faite qu'une fois.
+    """
+    idx = np.clip(np.searchsorted(xp, x, side="right") - 1, 0, len(xp) - 2)
+    x0 = xp[idx]
+    span = xp[idx + 1] - x0
+    t = np.divide(x - x0, span, out=np.zeros(len(x)), where=span > 0)
+    t = np.clip(t, 0.0, 1.0)[:, None]
+    return fp[idx] * (1.0 - t) + fp[idx + 1] * t
+
+
 def detect_stationary(accel_df: pd.DataFrame, gyro_df: pd.DataFrame, window: int = 50) -> np.ndarray:
     """
     Détecte les moments où le véhicule est à l'arrêt (ZUPT - Zero Velocity Update).
@@ -86,25 +131,56 @@ def detect_stationary(accel_df: pd.DataFrame, gyro_df: pd.DataFrame, window: int
         accel_df["seconds_elapsed"].values,
         gyro_df["seconds_elapsed"].values,
         gyro_df["y"].values
-    )
+    ).astype(SAMPLE_DTYPE)
 
-    accel_mag = np.sqrt(accel_df["x"]**2 + accel_df["y"]**2 + accel_df["z"]**2).values
+    accel_xyz = accel_df[["x", "y", "z"]].to_numpy(dtype=SAMPLE_DTYPE)
+    accel_mag = np.sqrt(np.square(accel_xyz).sum(axis=1))
 
     is_stationary = np.zeros(len(accel_df), dtype=bool)
+    if len(accel_df) <= window:
+        return is_stationary
 
-    for i in range(window, len(accel_df)):
-        # Variance sur une fenêtre glissante
-        accel_var = np.var(accel_mag[i-window:i])
-        gyro_var = np.var(gyro_y_interp[i-window:i])
+    # Variance sur une fenêtre glissante (les window échantillons précédant i)
+    accel_var = rolling_variance(accel_mag, window)
+    gyro_var = rolling_variance(gyro_y_interp, window)
 
-        # Seuils empiriques pour détecter l'arrêt
-        # Faible variance = pas de mouvement
-        if accel_var < 0.002 and gyro_var < 0.01:
-            is_stationary[i] = True
+    # Seuils empiriques pour détecter l'arrêt
+    # Faible variance = pas de mouvement
+    is_stationary[window:] = (accel_var < 0.002) & (gyro_var < 0.01)
 
     return is_stationary
 
 
+def pre_integrate(rate: np.ndarray, dt: np.ndarray) -> np.ndarray:
+    """Intègre une vitesse angulaire (rad/s) en angle cumulé (rad), en float64."""
+    increments = np.multiply(rate, dt, dtype=np.float64)
+    return np.cumsum(increments, out=increments)
+
+
+def integrate_zupt(accel: np.ndarray, dt: np.ndarray, is_stationary: np.ndarray, damping: float = 0.995) -> np.ndarray:
+    """
+    Intègre l'accélération en vitesse avec remise à zéro aux arrêts (ZUPT).
+
+    Équivaut à la boucle:
+        velocity[0] = 0
+        velocity[i] = 0 si is_stationary[i]
+        sinon velocity[i] = (velocity[i-1] + accel[i] * dt[i]) * damping
+
+    L'intégration amortie est un filtre récursif du premier ordre (lfilter) appliqué
+    d'une traite; la remise à zéro revient à retrancher, depuis le dernier arrêt s,
+    la contribution amortie damping^(i-s) * w[s] de l'état à cet arrêt.
+    """
+    w = lfilter([damping], [1.0, -damping], accel * dt)
+
+    # Index du dernier point de remise à zéro (arrêt, ou premier échantillon)
+    reset = np.asarray(is_stationary, dtype=bool).copy()
+    reset[0] = True
+    idx = np.arange(len(w))
+    last_reset = np.maximum.accumulate(np.where(reset, idx, 0))
+
+    return w - damping ** (idx - last_reset) * w[last_reset]
+
+
 def compute_speed_from_accel(accel_df: pd.DataFrame, gyro_df: pd.DataFrame) -> np.ndarray:
     """
     Calcule la vitesse à partir de l'accélération avec correction gyroscopique.
@@ -123,24 +199,27 @@ def compute_speed_from_accel(accel_df: pd.DataFrame, gyro_df: pd.DataFrame) -> n
     dt = np.diff(time_elapsed, prepend=time_elapsed[0])
     dt[0] = dt[1] if len(dt) > 1 else 0.01
 
-    # Interpoler gyro sur les timestamps de accel
+    # Interpoler gyro sur les timestamps de accel (seul l'axe X sert, pour le pitch)
     gyro_x = np.interp(time_elapsed, gyro_df["seconds_elapsed"].values, gyro_df["x"].values)
-    gyro_y = np.interp(time_elapsed, gyro_df["seconds_elapsed"].values, gyro_df["y"].values)
-    gyro_z = np.interp(time_elapsed, gyro_df["seconds_elapsed"].values, gyro_df["z"].values)
 
     # Accélération brute
-    accel_x = accel_df["x"].values * G
-    accel_y = accel_df["y"].values * G
-    accel_z = accel_df["z"].values * G
+    accel_y = accel_df["y"].to_numpy(dtype=SAMPLE_DTYPE) * SAMPLE_DTYPE(G)
+    accel_z = accel_df["z"].to_numpy(dtype=SAMPLE_DTYPE) * SAMPLE_DTYPE(G)
 
     # Intégrer le gyroscope pour obtenir l'orientation (angles d'Euler simplifiés)
     # En position verticale: X=pitch, Y=yaw, Z=roll
-    pitch = np.cumsum(gyro_x * dt)  # rotation avant/arrière
+    pitch = pre_integrate(gyro_x, dt)  # rotation avant/arrière
 
     # Corriger l'accélération Z en tenant compte du pitch
     # Si le téléphone penche vers l'avant, une partie de la gravité apparaît sur Z
     # accel_z_corrected = accel_z * cos(pitch) - accel_y * sin(pitch)
-    accel_z_corrected = accel_z * np.cos(pitch) + accel_y * np.sin(pitch)
+    # accel_z * cos(pitch) + accel_y * sin(pitch), calculé sur place dans deux
+    # buffers au lieu de quatre temporaires
+    accel_z_corrected = np.cos(pitch, dtype=SAMPLE_DTYPE)
+    accel_z_corrected *= accel_z
+    gravity_part = np.sin(pitch, dtype=SAMPLE_DTYPE)
+    gravity_part *= accel_y
+    accel_z_corrected += gravity_part
 
     # Filtrer le bruit
     accel_z_filtered = butter_lowpass_filter(accel_z_corrected, cutoff=3.0, fs=SENSOR_FREQ)
@@ -154,16 +233,7 @@ def compute_speed_from_accel(accel_df: pd.DataFrame, gyro_df: pd.DataFrame) -> n
     is_stationary = detect_stationary(accel_df, gyro_df)
 
     # Intégrer avec ZUPT
-    velocity = np.zeros(len(accel_df))
-    for i in range(1, len(accel_df)):
-        if is_stationary[i]:
-            # À l'arrêt: remettre la vitesse à zéro
-            velocity[i] = 0
-        else:
-            # En mouvement: intégrer l'accélération
-            velocity[i] = velocity[i-1] + accel_z_final[i] * dt[i]
-            # Petit amortissement pour stabiliser
-            velocity[i] *= 0.995
+    velocity = integrate_zupt(accel_z_final, dt, is_stationary)
 
     # Filtrer le résultat pour lisser
     velocity_filtered = butter_lowpass_filter(velocity, cutoff=2.0, fs=SENSOR_FREQ)
@@ -180,7 +250,7 @@ def compute_direction_from_gyro(gyro_df: pd.DataFrame) -> np.ndarray:
     - Positif = tourne à droite, Négatif = tourne à gauche
     """
     # Taux de rotation sur l'axe Y (yaw en position verticale) en rad/s
-    gyro_y = gyro_df["y"].values
+    gyro_y = gyro_df["y"].to_numpy(dtype=SAMPLE_DTYPE)
 
     # Filtrer pour réduire le bruit
     gyro_y_filtered = butter_lowpass_filter(gyro_y, cutoff=5.0, fs=SENSOR_FREQ)
@@ -188,14 +258,13 @@ def compute_direction_from_gyro(gyro_df: pd.DataFrame) -> np.ndarray:
     return gyro_y_filtered
 
 
-def direction_to_enum(direction_percent: float) -> str:
-    """Convertit un pourcentage de direction en enum."""
-    if abs(direction_percent) < (STRAIGHT_THRESHOLD_DEG / 45.0 * 100):
-        return "STRAIGHT"
-    elif direction_percent > 0:
-        return "RIGHT"
-    else:
-        return "LEFT"
+def direction_to_enum(direction_percent: np.ndarray) -> np.ndarray:
+    """Convertit des pourcentages de direction en enum (LEFT, RIGHT ou STRAIGHT)."""
+    return np.where(
+        np.abs(direction_percent) < (STRAIGHT_THRESHOLD_DEG / 45.0 * 100),
+        "STRAIGHT",
+        np.where(direction_percent > 0, "RIGHT", "LEFT"),
+    )
 
 
 def main() -> None:
@@ -225,22 +294,15 @@ def main() -> None:
     merged_df = pd.DataFrame()
     merged_df["seconds_elapsed"] = gyro_df["seconds_elapsed"].values
 
-    # Interpoler l'accélération sur les timestamps du gyro
-    merged_df["accel_x"] = np.interp(
-        gyro_df["seconds_elapsed"].values,
-        accel_df["seconds_elapsed"].values,
-        accel_df["x"].values
-    )
-    merged_df["accel_y"] = np.interp(
+    # Interpoler l'accélération sur les timestamps du gyro (les 3 axes d'un coup)
+    accel_interp = interp_columns(
         gyro_df["seconds_elapsed"].values,
         accel_df["seconds_elapsed"].values,
-        accel_df["y"].values
-    )
-    merged_df["accel_z"] = np.interp(
-        gyro_df["seconds_elapsed"].values,
-        accel_df["seconds_elapsed"].values,
-        accel_df["z"].values
+        accel_df[["x", "y", "z"]].values,
     )
+    merged_df["accel_x"] = accel_interp[:, 0]
+    merged_df["accel_y"] = accel_interp[:, 1]
+    merged_df["accel_z"] = accel_interp[:, 2]
     merged_df["gyro_z"] = gyro_df["z"].values
 
     # Calculer la vitesse
@@ -257,34 +319,31 @@ def main() -> None:
     print("  - Calcul de la direction...")
     direction_rad_s = compute_direction_from_gyro(gyro_df)
 
-    # Construire le DataFrame de sortie
-    output_df = pd.DataFrame()
-    output_df["seconds_elapsed"] = merged_df["seconds_elapsed"]
-
     # Vitesse
-    output_df["speed_ms"] = np.abs(speed_ms_interp)  # Valeur absolue pour la vitesse
-    max_observed_speed = max(output_df["speed_ms"].max(), 0.1)  # Éviter division par 0
-    output_df["speed_percent"] = np.clip(
-        output_df["speed_ms"] / MAX_SPEED_MS * 100, 0, 100
-    ).round(1)
+    speed_ms_abs = np.abs(speed_ms_interp)  # Valeur absolue pour la vitesse
+    max_observed_speed = max(speed_ms_abs.max(), 0.1)  # Éviter division par 0
+    speed_percent = np.clip(speed_ms_abs / MAX_SPEED_MS * 100, 0, 100)
 
     # Direction
     # Convertir rad/s en pourcentage (-100 à +100)
     direction_percent = np.clip(
         direction_rad_s / MAX_TURN_RATE * 100, -100, 100
     )
-    output_df["direction_percent"] = direction_percent.round(1)
-
-    # Enum de direction
-    output_df["direction_enum"] = [direction_to_enum(d) for d in direction_percent]
 
     # Angle en degrés (approximation: taux de rotation → angle de braquage)
     # On suppose que le taux de rotation max correspond à un angle de braquage de ~45°
     direction_angle = direction_rad_s / MAX_TURN_RATE * 45.0
-    output_df["direction_angle_deg"] = np.clip(direction_angle, -45, 45).round(1)
 
-    # Ajuster le temps pour commencer au point de synchronisation
-    output_df["seconds_elapsed"] = (output_df["seconds_elapsed"] - sensor_start).round(6)
+    # Construire le DataFrame de sortie en une fois
+    # Le temps est ajusté pour commencer au point de synchronisation
+    output_df = pd.DataFrame({
+        "seconds_elapsed": (merged_df["seconds_elapsed"].to_numpy() - sensor_start).round(6),
+        "speed_ms": speed_ms_abs,
+        "speed_percent": speed_percent.round(1),
+        "direction_percent": direction_percent.round(1),
+        "direction_enum": direction_to_enum(direction_percent),
+        "direction_angle_deg": np.clip(direction_angle, -45, 45).round(1),
+    })
 
     # Filtrer pour ne garder que les données à partir du point de sync (t >= 0)
     output_df = output_df[output_df["seconds_elapsed"] >= 0].reset_index(drop=True)
@@ -16,6 +16,9 @@ Exemple:
 import sys
 import os
 import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2
 import matplotlib.pyplot as plt
@@ -30,16 +33,40 @@ from utils import (
     rotate_frame,
     create_aruco_detector,
     detect_aruco_markers,
-    estimate_marker_distance,
-    estimate_marker_angle,
+    estimate_markers_distance_angle,
     compute_trajectory_from_gyro,
     frame_to_motor_time,
+    nearest_index,
+    nearest_indices,
     TAG_TO_GATE,
+    GATE_TAG_IDS,
     GATES,
     GATE_WIDTH_M,
 )
 
 
+# Nombre max de points de trajectoire tracés (le rendu matplotlib est
+# proportionnel au nombre de segments de la LineCollection)
+MAX_PLOT_POINTS = 2000
+
+# Un détecteur ArUco et un buffer de rotation par thread de détection
+_thread_state = threading.local()
+
+
+def detect_frame_markers(frame, rotation: int) -> tuple:
+    """Tourne la frame puis y détecte les markers, avec le détecteur du thread courant."""
+    detector = getattr(_thread_state, "detector", None)
+    if detector is None:
+        detector = create_aruco_detector()
+        _thread_state.detector = detector
+    # Le buffer de rotation est réutilisé d'une frame à l'autre (retourné tel
+    # quel par rotate_frame et réalloué par OpenCV si les dimensions changent)
+    rotated = rotate_frame(frame, rotation, getattr(_thread_state, "rotated", None))
+    if rotated is not frame:
+        _thread_state.rotated = rotated
+    return detect_aruco_markers(rotated, detector)
+
+
 def find_gates_in_video(
     video_path: str,
     motor_df,
@@ -57,102 +84,134 @@ def find_gates_in_video(
         Dict[gate_num] -> {'x': float, 'y': float, 'yaw': float, 'detections': int}
     """
     cap, fps_video, total_frames, width, height, rotation = open_video(video_path)
-    detector = create_aruco_detector()
-
-    gates_detected = {}  # gate_num -> list of (x, y, yaw)
-
-    print(f"  Analyse de la vidéo ({total_frames} frames)...")
-
-    frame_idx = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame_idx += 1
-
-        # Échantillonner pour accélérer
-        if frame_idx % sample_every_n_frames != 0:
-            continue
 
-        frame = rotate_frame(frame, rotation)
+    # Détections de markers de porte, une entrée par marker (tableaux parallèles)
+    detected_gate = []  # numéro de porte
+    detected_left = []  # True si tag gauche
+    detected_x = []
+    detected_y = []
+    detected_yaw = []  # orientation estimée de la porte
+    motor_times = motor_df["seconds_elapsed"].to_numpy()  # trié croissant
 
-        # Détecter les markers
-        corners, ids = detect_aruco_markers(frame, detector)
+    # Index dans la trajectoire de chaque frame, précalculé en une fois
+    # (-1 pour les frames hors de la plage de motor.csv)
+    frame_times = frame_to_motor_time(np.arange(total_frames + 1), fps, video_start_frame)
+    traj_for_frame = nearest_indices(motor_times, frame_times)
+    traj_for_frame[(frame_times < 0) | (frame_times > motor_times[-1])] = -1
 
-        if ids is None or len(ids) == 0:
-            continue
+    print(f"  Analyse de la vidéo ({total_frames} frames)...")
 
-        # Calculer le temps et trouver la position correspondante
-        motor_time = frame_to_motor_time(frame_idx, fps, video_start_frame)
-        if motor_time < 0 or motor_time > motor_df["seconds_elapsed"].max():
-            continue
+    def process_detection(frame_idx: int, corners, ids) -> None:
+        """Ajoute aux détections les markers de porte vus sur la frame frame_idx."""
+        if len(ids) == 0:
+            return
+
+        # Trouver l'index dans la trajectoire correspondant au temps de la frame
+        if frame_idx < len(traj_for_frame):
+            traj_idx = traj_for_frame[frame_idx]
+        else:
+            # Frame au-delà du nombre annoncé par les métadonnées
+            motor_time = frame_to_motor_time(frame_idx, fps, video_start_frame)
+            traj_idx = nearest_index(motor_times, motor_time) if 0 <= motor_time <= motor_times[-1] else -1
+        if traj_idx < 0:
+            return
 
-        # Trouver l'index dans la trajectoire
-        traj_idx = (motor_df["seconds_elapsed"] - motor_time).abs().idxmin()
         kart_x = trajectory_x[traj_idx]
         kart_y = trajectory_y[traj_idx]
         kart_yaw = trajectory_yaw[traj_idx]
 
-        # Traiter chaque marker détecté
-        for corner, marker_id in zip(corners, ids.flatten()):
-            if marker_id not in TAG_TO_GATE:
-                continue
+        # Ne garder que les markers des portes, traités tous ensemble
+        is_gate_tag = np.isin(ids, GATE_TAG_IDS)
+        if not is_gate_tag.any():
+            return
+        gate_corners = corners[is_gate_tag]  # (K, 4, 2)
 
-            gate_num, side = TAG_TO_GATE[marker_id]
+        # Estimer la distance et l'angle des markers
+        distances, angles = estimate_markers_distance_angle(gate_corners, width)
 
-            # Estimer la distance et l'angle du marker
-            distance = estimate_marker_distance(corner, width)
-            angle = estimate_marker_angle(corner, width)
+        # Position des markers dans le repère monde
+        # Chaque marker est à (distance, angle) du kart
+        marker_angles_world = kart_yaw + angles
+        markers_x = kart_x + distances * np.cos(marker_angles_world)
+        markers_y = kart_y + distances * np.sin(marker_angles_world)
 
-            # Position du marker dans le repère monde
-            # Le marker est à (distance, angle) du kart
-            marker_angle_world = kart_yaw + angle
-            marker_x = kart_x + distance * np.cos(marker_angle_world)
-            marker_y = kart_y + distance * np.sin(marker_angle_world)
+        # Estimer l'orientation de la porte (perpendiculaire à la direction du kart)
+        gate_yaw = kart_yaw + np.pi / 2  # La porte est perpendiculaire
+
+        for marker_id in ids[is_gate_tag].tolist():
+            gate_num, side = TAG_TO_GATE[marker_id]
+            detected_gate.append(gate_num)
+            detected_left.append(side == "L")
+        detected_x.extend(markers_x.tolist())
+        detected_y.extend(markers_y.tolist())
+        detected_yaw.extend([gate_yaw] * len(markers_x))
+
+    # Le thread principal décode, les workers tournent et détectent (OpenCV
+    # relâche le GIL); les résultats sont traités dans l'ordre des frames
+    workers = os.cpu_count() or 1
+    pending = deque()  # (frame_idx, future) des frames en cours de détection
+    # Buffers de décodage réutilisés en tourniquet: une frame en attente de
+    # détection (au plus 2 * workers) n'est jamais écrasée
+    frame_buffers = [None] * (2 * workers + 1)
+    buffer_slot = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frame_idx = 0
+        while True:
+            # grab() avance sans convertir l'image: seules les frames échantillonnées
+            # sont récupérées (retrieve) et converties en BGR
+            if not cap.grab():
+                break
+
+            frame_idx += 1
+
+            # Afficher la progression
+            if frame_idx % 100 == 0:
+                print(f"    Frame {frame_idx}/{total_frames}")
+
+            # Échantillonner pour accélérer
+            if frame_idx % sample_every_n_frames != 0:
+                continue
 
-            # Estimer l'orientation de la porte (perpendiculaire à la direction du kart)
-            gate_yaw = kart_yaw + np.pi / 2  # La porte est perpendiculaire
+            ret, frame = cap.retrieve(frame_buffers[buffer_slot])
+            if not ret:
+                break
+            frame_buffers[buffer_slot] = frame
+            buffer_slot = (buffer_slot + 1) % len(frame_buffers)
 
-            if gate_num not in gates_detected:
-                gates_detected[gate_num] = []
+            pending.append((frame_idx, pool.submit(detect_frame_markers, frame, rotation)))
 
-            gates_detected[gate_num].append({
-                'x': marker_x,
-                'y': marker_y,
-                'yaw': gate_yaw,
-                'side': side,
-                'distance': distance,
-            })
+            # Borner le nombre de frames décodées en attente (mémoire)
+            if len(pending) > 2 * workers:
+                done_idx, future = pending.popleft()
+                process_detection(done_idx, *future.result())
 
-        # Afficher la progression
-        if frame_idx % 100 == 0:
-            print(f"    Frame {frame_idx}/{total_frames}")
+        while pending:
+            done_idx, future = pending.popleft()
+            process_detection(done_idx, *future.result())
 
     cap.release()
 
-    # Moyenner les détections pour chaque porte
-    gates_final = {}
-    for gate_num, detections in gates_detected.items():
-        if len(detections) == 0:
-            continue
-
-        # Séparer les détections gauche et droite
-        left_detections = [d for d in detections if d['side'] == 'L']
-        right_detections = [d for d in detections if d['side'] == 'R']
+    # Moyenner les détections pour chaque porte (médiane par numéro de porte)
+    gate_nums = np.array(detected_gate, dtype=int)
+    is_left = np.array(detected_left, dtype=bool)
+    xs = np.array(detected_x)
+    ys = np.array(detected_y)
+    yaws = np.array(detected_yaw)
 
-        # Calculer le centre de la porte
-        all_x = [d['x'] for d in detections]
-        all_y = [d['y'] for d in detections]
-        all_yaw = [d['yaw'] for d in detections]
+    gates_final = {}
+    for gate_num in np.unique(gate_nums).tolist():
+        in_gate = gate_nums == gate_num
+        count = int(np.count_nonzero(in_gate))
+        left_count = int(np.count_nonzero(is_left[in_gate]))
 
         gates_final[gate_num] = {
-            'x': np.median(all_x),
-            'y': np.median(all_y),
-            'yaw': np.median(all_yaw),
-            'detections': len(detections),
-            'left_count': len(left_detections),
-            'right_count': len(right_detections),
+            'x': np.median(xs[in_gate]),
+            'y': np.median(ys[in_gate]),
+            'yaw': np.median(yaws[in_gate]),
+            'detections': count,
+            'left_count': left_count,
+            'right_count': count - left_count,
         }
 
     return gates_final
@@ -176,14 +235,20 @@ def generate_map_image(
     """
     fig, ax = plt.subplots(figsize=(12, 10))
 
+    # Sous-échantillonner la trajectoire (pas uniforme, dernier point conservé)
+    stride = max(1, len(trajectory_x) // MAX_PLOT_POINTS)
+    plot_idx = np.arange(0, len(trajectory_x), stride)
+    if plot_idx[-1] != len(trajectory_x) - 1:
+        plot_idx = np.append(plot_idx, len(trajectory_x) - 1)
+
     # Tracer la trajectoire avec un dégradé de couleur (temps)
-    points = np.array([trajectory_x, trajectory_y]).T.reshape(-1, 1, 2)
-    segments = np.concatenate([points[:-1], points[1:]], axis=1)
+    points = np.column_stack([trajectory_x[plot_idx], trajectory_y[plot_idx]])
+    segments = np.stack([points[:-1], points[1:]], axis=1)
 
-    # Créer un dégradé de couleur du bleu au rouge
+    # Créer un dégradé de couleur du bleu au rouge (indexé sur le temps d'origine)
     norm = plt.Normalize(0, len(trajectory_x))
     lc = LineCollection(segments, cmap='viridis', norm=norm, linewidth=2, alpha=0.8)
-    lc.set_array(np.arange(len(trajectory_x)))
+    lc.set_array(plot_idx[:-1])
     ax.add_collection(lc)
 
     # Marquer le départ
@@ -290,11 +355,12 @@ def main():
     print("Calcul de la trajectoire...")
 
     # Normaliser les timestamps du gyro pour commencer à 0 comme motor.csv
-    gyro_df_normalized = gyro_df.copy()
-    gyro_df_normalized["seconds_elapsed"] = gyro_df["seconds_elapsed"] - sensor_start
+    # (simple tableau: pas de copie du DataFrame gyro)
+    gyro_seconds = gyro_df["seconds_elapsed"].to_numpy()
+    gyro_times = gyro_seconds - gyro_seconds[0]
 
     trajectory_x, trajectory_y, trajectory_yaw = compute_trajectory_from_gyro(
-        gyro_df_normalized, motor_df
+        gyro_times, gyro_df["y"].to_numpy(), motor_df
     )
 
     print(f"  - Distance totale: {np.sum(np.sqrt(np.diff(trajectory_x)**2 + np.diff(trajectory_y)**2)):.2f} m")
@@ -8,11 +8,16 @@ Ce module contient les fonctions communes utilisées par:
 """
 
 import os
+import math
+import importlib.util
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 import cv2
-from scipy.signal import butter, filtfilt
+from scipy.signal import butter, sosfiltfilt
 
 
 # =============================================================================
@@ -21,6 +26,7 @@ from scipy.signal import butter, filtfilt
 
 G = 9.81  # m/s²
 SENSOR_FREQ = 100  # Hz approximatif
+_DEG2RAD = math.pi / 180.0
 
 # Configuration ArUco
 ARUCO_DICT = cv2.aruco.DICT_4X4_50
@@ -35,12 +41,18 @@ GATES = {
     4: (40, 41),
 }
 
+# Facteur de réduction appliqué avant la détection ArUco
+DETECTION_SCALE = 0.5
+
 # Mapping ID -> (numéro de porte, côté)
 TAG_TO_GATE = {}
 for gate_num, (left_id, right_id) in GATES.items():
     TAG_TO_GATE[left_id] = (gate_num, "L")
     TAG_TO_GATE[right_id] = (gate_num, "R")
 
+# IDs des tags appartenant à une porte
+GATE_TAG_IDS = np.array(sorted(TAG_TO_GATE))
+
 # Distance entre les tags d'une porte (bord intérieur à bord intérieur)
 GATE_INNER_DISTANCE_CM = 17.5
 GATE_WIDTH_M = (GATE_INNER_DISTANCE_CM + 2 * TAG_SIZE_CM) / 100.0  # Distance centre à centre
@@ -50,6 +62,10 @@ GATE_WIDTH_M = (GATE_INNER_DISTANCE_CM + 2 * TAG_SIZE_CM) / 100.0  # Distance ce
 # Chargement des données
 # =============================================================================
 
+# Parseur CSV multithreadé de pyarrow s'il est installé (sinon parseur C de pandas)
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
+
+
 def load_calibration(folder: str) -> tuple[float, int]:
     """Charge calib.csv et retourne (sensor_start_time, video_start_frame)."""
     calib_path = os.path.join(folder, "calib.csv")
@@ -63,8 +79,8 @@ def load_sensor_data(folder: str) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Charge accel.csv et gyro.csv."""
     accel_path = os.path.join(folder, "accel.csv")
     gyro_path = os.path.join(folder, "gyro.csv")
-    accel_df = pd.read_csv(accel_path)
-    gyro_df = pd.read_csv(gyro_path)
+    accel_df = pd.read_csv(accel_path, engine=CSV_ENGINE)
+    gyro_df = pd.read_csv(gyro_path, engine=CSV_ENGINE)
     return accel_df, gyro_df
 
 
@@ -72,7 +88,7 @@ def load_motor_data(folder: str) -> pd.DataFrame | None:
     """Charge motor.csv s'il existe."""
     motor_path = os.path.join(folder, "motor.csv")
     if os.path.exists(motor_path):
-        return pd.read_csv(motor_path)
+        return pd.read_csv(motor_path, engine=CSV_ENGINE)
     return None
 
 
@@ -80,6 +96,28 @@ def load_motor_data(folder: str) -> pd.DataFrame | None:
 # Synchronisation
 # =============================================================================
 
+def nearest_index(times: np.ndarray, t: float) -> int:
+    """
+    Index de la valeur la plus proche de t dans times (trié croissant).
+
+    Recherche dichotomique; en cas d'égalité, l'index le plus petit est retenu
+    (comme idxmin).
+    """
+    j = int(np.searchsorted(times, t))
+    if j == len(times) or (j > 0 and times[j] - t >= t - times[j - 1]):
+        j -= 1
+    return j
+
+
+def nearest_indices(times: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """Version vectorisée de nearest_index: un index de times par valeur de queries."""
+    j = np.searchsorted(times, queries)
+    prev = np.maximum(j - 1, 0)
+    nxt = np.minimum(j, len(times) - 1)
+    use_prev = (j == len(times)) | ((j > 0) & (times[nxt] - queries >= queries - times[prev]))
+    return np.where(use_prev, prev, j)
+
+
 def sync_sensor_to_frame(
     frame_idx: int,
     fps: float,
@@ -94,8 +132,8 @@ def sync_sensor_to_frame(
     if sensor_time < 0:
         return None
 
-    idx = (sensor_df["seconds_elapsed"] - sensor_time).abs().idxmin()
-    return sensor_df.loc[idx]
+    idx = nearest_index(sensor_df["seconds_elapsed"].to_numpy(), sensor_time)
+    return sensor_df.iloc[idx]
 
 
 def sync_motor_to_frame(
@@ -110,8 +148,8 @@ def sync_motor_to_frame(
     if video_time < 0:
         return None
 
-    idx = (motor_df["seconds_elapsed"] - video_time).abs().idxmin()
-    return motor_df.loc[idx]
+    idx = nearest_index(motor_df["seconds_elapsed"].to_numpy(), video_time)
+    return motor_df.iloc[idx]
 
 
 def frame_to_motor_time(frame_idx: int, fps: float, video_start_frame: int) -> float:
@@ -123,28 +161,35 @@ def frame_to_motor_time(frame_idx: int, fps: float, video_start_frame: int) -> f
 # Filtrage
 # =============================================================================
 
-def butter_lowpass_filter(data: np.ndarray, cutoff: float, fs: float, order: int = 4) -> np.ndarray:
-    """Applique un filtre passe-bas Butterworth."""
+@lru_cache(maxsize=32)
+def butter_sos(cutoff: float, fs: float, order: int, btype: str) -> np.ndarray:
+    """
+    Filtre Butterworth en sections du second ordre (SOS), calculé une seule fois par réglage.
+
+    La forme SOS est numériquement plus stable que (b, a) pour les coupures basses.
+    """
     nyq = 0.5 * fs
     normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='low', analog=False)
-    return filtfilt(b, a, data)
+    return butter(order, normal_cutoff, btype=btype, analog=False, output='sos')
+
+
+def butter_lowpass_filter(data: np.ndarray, cutoff: float, fs: float, order: int = 4) -> np.ndarray:
+    """Applique un filtre passe-bas Butterworth."""
+    return sosfiltfilt(butter_sos(cutoff, fs, order, 'low'), data)
 
 
 def butter_highpass_filter(data: np.ndarray, cutoff: float, fs: float, order: int = 4) -> np.ndarray:
     """Applique un filtre passe-haut Butterworth."""
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='high', analog=False)
-    return filtfilt(b, a, data)
+    return sosfiltfilt(butter_sos(cutoff, fs, order, 'high'), data)
 
 
 # =============================================================================
 # Vidéo
 # =============================================================================
 
+@lru_cache(maxsize=None)
 def get_video_rotation(video_path: str) -> int:
-    """Récupère la rotation de la vidéo via ffprobe."""
+    """Récupère la rotation de la vidéo via ffprobe (résultat mis en cache par fichier)."""
     try:
         result = subprocess.run(
             [
@@ -165,14 +210,18 @@ def get_video_rotation(video_path: str) -> int:
     return 0
 
 
-def rotate_frame(frame, rotation: int):
-    """Applique la rotation à une frame selon les métadonnées vidéo."""
+def rotate_frame(frame, rotation: int, dst=None):
+    """
+    Applique la rotation à une frame selon les métadonnées vidéo.
+
+    dst est un buffer optionnel (aux dimensions tournées) réutilisé pour le résultat.
+    """
     if rotation == -90 or rotation == 270:
-        return cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
+        return cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE, dst=dst)
     elif rotation == 90 or rotation == -270:
-        return cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        return cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE, dst=dst)
     elif rotation == 180 or rotation == -180:
-        return cv2.rotate(frame, cv2.ROTATE_180)
+        return cv2.rotate(frame, cv2.ROTATE_180, dst=dst)
     return frame
 
 
@@ -187,12 +236,22 @@ def open_video(video_path: str) -> tuple[cv2.VideoCapture, float, int, int, int,
     if not cap.isOpened():
         raise Exception(f"Impossible d'ouvrir la vidéo '{video_path}'")
 
+    # Rotation lue dans les métadonnées par OpenCV: pas de sous-process ffprobe.
+    # Elle est appliquée par rotate_frame plutôt que par le backend, pour que les
+    # frames puissent être décodées dans des buffers réutilisés (retrieve(image=...)).
+    orientation = int(cap.get(cv2.CAP_PROP_ORIENTATION_META))
+    if orientation and cap.set(cv2.CAP_PROP_ORIENTATION_AUTO, 0):
+        rotation = -orientation  # 90 (sens horaire) correspond à -90 chez ffprobe
+    elif orientation or cap.get(cv2.CAP_PROP_ORIENTATION_AUTO):
+        rotation = 0  # le backend tourne déjà les frames (ou rien à tourner)
+    else:
+        rotation = get_video_rotation(video_path)
+
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
-    rotation = get_video_rotation(video_path)
     if rotation in (-90, 90, 270, -270):
         width, height = height, width
 
@@ -203,18 +262,231 @@ def open_video(video_path: str) -> tuple[cv2.VideoCapture, float, int, int, int,
 # ArUco
 # =============================================================================
 
-def create_aruco_detector():
-    """Crée un détecteur ArUco configuré pour les tags 4x4."""
+@lru_cache(maxsize=1)
+def _aruco_config() -> tuple:
+    """Dictionnaire et paramètres ArUco, construits une seule fois."""
     aruco_dict = cv2.aruco.getPredefinedDictionary(ARUCO_DICT)
     aruco_params = cv2.aruco.DetectorParameters()
-    return cv2.aruco.ArucoDetector(aruco_dict, aruco_params)
+    aruco_params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_NONE
+    aruco_params.adaptiveThreshWinSizeStep = 20
+    aruco_params.minMarkerPerimeterRate = 0.03
+    return aruco_dict, aruco_params
 
 
-def detect_aruco_markers(frame, detector) -> tuple:
-    """Détecte les markers ArUco dans une frame."""
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    corners, ids, rejected = detector.detectMarkers(gray)
-    return corners, ids
+def create_aruco_detector():
+    """
+    Crée un détecteur ArUco configuré pour les tags 4x4.
+
+    Réglé pour la vitesse: pas de raffinement sous-pixel des coins (les
+    positions des portes sont des médianes de nombreuses détections) et deux
+    tailles de fenêtre de seuillage adaptatif (3 et 23 px) au lieu de trois.
+
+    Le dictionnaire et les paramètres sont partagés entre les appels; créer
+    un détecteur par thread et le réutiliser pour toutes les frames.
+    """
+    return cv2.aruco.ArucoDetector(*_aruco_config())
+
+
+# Transparent API OpenCV: avec des UMat, cvtColor/resize/détection passent sur
+# le GPU via OpenCL quand il est disponible (sinon on reste en NumPy)
+USE_OPENCL = cv2.ocl.haveOpenCL()
+cv2.ocl.setUseOpenCL(USE_OPENCL)
+
+# Résultat de detect_aruco_markers sans marker (lecture seule, partagé)
+_NO_CORNERS = np.empty((0, 4, 2), dtype=np.float32)
+_NO_CORNERS.flags.writeable = False
+_NO_IDS = np.empty(0, dtype=np.int32)
+_NO_IDS.flags.writeable = False
+
+
+def detect_aruco_markers(frame, detector, scale: float = DETECTION_SCALE, rois=None) -> tuple:
+    """
+    Détecte les markers ArUco dans une frame.
+
+    La détection est faite en niveaux de gris sur une image réduite de scale
+    (4x moins de pixels à 0.5), puis les coins sont remis à l'échelle de la frame.
+
+    Si rois est donné (liste de (x, y, w, h) en pixels de la frame, cf.
+    marker_rois), seules ces zones sont analysées: beaucoup moins de pixels à
+    seuiller, mais un marker apparu hors des zones n'est pas vu: MarkerTracker
+    gère ces zones et les passes régulières sur la frame entière.
+
+    Returns:
+        (corners, ids): coins des M markers en pixels de la frame, tableau
+        (M, 4, 2) float32, et leurs identifiants, tableau (M,) int32
+        (M = 0 si aucun marker)
+    """
+    # Conversion en gris avant réduction: aussi rapide que réduire l'image BGR
+    # puis convertir (~1.2 ms par frame 1080p), et les crops des rois en profitent.
+    # Une frame déjà en niveaux de gris est utilisée telle quelle.
+    is_gray = frame.ndim == 2
+    if rois is None:
+        if USE_OPENCL:
+            frame = cv2.UMat(frame)
+        gray = frame if is_gray else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if scale != 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        corners, ids, rejected = detector.detectMarkers(gray)
+        if USE_OPENCL and ids is not None:
+            # Rapatrier uniquement les résultats (quelques points) en mémoire hôte
+            corners = tuple(c.get() for c in corners)
+            ids = ids.get()
+        if ids is None:
+            return _NO_CORNERS, _NO_IDS
+        # Tuple de (1, 4, 2) d'OpenCV -> un seul tableau (M, 4, 2)
+        corners = np.concatenate(corners).reshape(-1, 4, 2)
+        if scale != 1.0:
+            corners /= scale
+        return corners, ids.reshape(-1)
+
+    # Zones petites: traitées en mémoire hôte (pas de transfert vers le GPU)
+    gray = frame if is_gray else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    roi_corners = []
+    roi_ids = []
+    for x, y, w, h in rois:
+        # Zone vide ou de moins d'un pixel une fois réduite: rien à détecter
+        # (et cv2.resize refuse une taille de sortie nulle)
+        if w * scale < 1 or h * scale < 1:
+            continue
+        sub = gray[y:y + h, x:x + w]
+        if scale != 1.0:
+            sub = cv2.resize(sub, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        corners, ids, rejected = detector.detectMarkers(sub)
+        if ids is None:
+            continue
+        offset = np.array([x, y], dtype=np.float32)
+        for corner, marker_id in zip(corners, ids.flatten().tolist()):
+            # Les zones peuvent se chevaucher: garder une détection par marker
+            if marker_id not in roi_ids:
+                roi_corners.append(corner / scale + offset)
+                roi_ids.append(marker_id)
+
+    if not roi_ids:
+        return _NO_CORNERS, _NO_IDS
+    return np.concatenate(roi_corners), np.array(roi_ids, dtype=np.int32)
+
+
+def detect_single_marker(frame, detector, scale: float = DETECTION_SCALE) -> tuple:
+    """
+    Cas courant d'un seul tag visible: retourne (corner, marker_id) du premier
+    marker détecté, corner étant un tableau (4, 2), ou (None, None).
+
+    Le résultat se passe directement à estimate_marker_distance et
+    estimate_marker_angle (versions scalaires, sans tableau intermédiaire).
+    """
+    corners, ids = detect_aruco_markers(frame, detector, scale)
+    if len(ids) == 0:
+        return None, None
+    return corners[0], int(ids[0])
+
+
+# Détecteurs ArUco des threads de detect_aruco_markers_batch (un par fabrique)
+_batch_detectors = threading.local()
+
+
+def detect_aruco_markers_batch(
+    frames,
+    detector_factory=create_aruco_detector,
+    scale: float = DETECTION_SCALE,
+    workers: int | None = None,
+) -> list:
+    """
+    Détecte les markers ArUco sur plusieurs frames en parallèle.
+
+    Des threads suffisent: OpenCV relâche le GIL pendant la conversion et la
+    détection. Chaque thread crée son propre détecteur avec detector_factory
+    et le réutilise pour toutes ses frames.
+
+    Returns:
+        Liste de (corners, ids), dans l'ordre des frames
+    """
+    def detect(frame):
+        detectors = getattr(_batch_detectors, "by_factory", None)
+        if detectors is None:
+            detectors = _batch_detectors.by_factory = {}
+        detector = detectors.get(detector_factory)
+        if detector is None:
+            detector = detectors[detector_factory] = detector_factory()
+        return detect_aruco_markers(frame, detector, scale)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        return list(pool.map(detect, frames))
+
+
+def marker_rois(corners, frame_width: int, frame_height: int, grow: float = 1.5, margin: int = 8) -> list:
+    """
+    Zones de recherche (x, y, w, h) autour de markers détectés, pour
+    detect_aruco_markers(..., rois=...) sur la frame suivante.
+
+    La boîte englobante de chaque marker est agrandie de grow (plus margin
+    pixels) pour suivre son déplacement, puis bornée à la frame.
+    """
+    pts = np.asarray(corners, dtype=np.float32).reshape(-1, 4, 2)
+    low = pts.min(axis=1)
+    high = pts.max(axis=1)
+    center = (low + high) / 2
+    half = (high - low) * (grow / 2) + margin
+
+    x0 = np.clip(center[:, 0] - half[:, 0], 0, frame_width).astype(int)
+    y0 = np.clip(center[:, 1] - half[:, 1], 0, frame_height).astype(int)
+    x1 = np.clip(center[:, 0] + half[:, 0], 0, frame_width).astype(int)
+    y1 = np.clip(center[:, 1] + half[:, 1], 0, frame_height).astype(int)
+    return list(zip(x0.tolist(), y0.tolist(), (x1 - x0).tolist(), (y1 - y0).tolist()))
+
+
+class MarkerTracker:
+    """
+    Détection ArUco suivie d'une frame à l'autre, pour des frames consécutives.
+
+    Après une détection, seules les zones autour des markers trouvés
+    (marker_rois) sont analysées sur la frame suivante. La frame entière est
+    analysée toutes les full_every frames (pour voir les markers qui entrent
+    dans le champ) et dès que les zones ne donnent plus aucun marker.
+
+    Sur les vidéos du circuit (toutes les frames), full_every=15 divise le
+    temps de détection par ~1.5 mais manque ~15% des détections: à réserver
+    aux usages où la vitesse prime sur l'exhaustivité.
+    """
+
+    def __init__(self, detector, full_every: int = 15, scale: float = DETECTION_SCALE):
+        self.detector = detector
+        self.full_every = full_every
+        self.scale = scale
+        self.rois = []  # zones de recherche pour la frame suivante (vide: frame entière)
+        self.frames_since_full = 0
+
+    def reset(self) -> None:
+        """Oublie les zones suivies (après un saut dans la vidéo par exemple)."""
+        self.rois = []
+        self.frames_since_full = 0
+
+    def detect(self, frame) -> tuple:
+        """Détecte les markers de frame, comme detect_aruco_markers."""
+        ids = _NO_IDS
+        if self.rois and self.frames_since_full < self.full_every:
+            corners, ids = detect_aruco_markers(frame, self.detector, self.scale, rois=self.rois)
+            self.frames_since_full += 1
+        if len(ids) == 0:
+            # Début, markers perdus ou frame entière périodique
+            corners, ids = detect_aruco_markers(frame, self.detector, self.scale)
+            self.frames_since_full = 0
+
+        height, width = frame.shape[:2]
+        self.rois = marker_rois(corners, width, height)
+        return corners, ids
+
+
+@lru_cache(maxsize=8)
+def _camera_consts(frame_width: int, fov_horizontal_deg: float) -> tuple[float, float]:
+    """
+    Constantes de la caméra pour une largeur d'image et un FOV horizontal.
+
+    Returns:
+        (focal_length en pixels, demi-FOV en radians)
+    """
+    half_fov = fov_horizontal_deg * _DEG2RAD / 2
+    # focal_length (en pixels) ≈ (frame_width / 2) / tan(fov/2)
+    return (frame_width / 2) / math.tan(half_fov), half_fov
 
 
 def estimate_marker_distance(corner, frame_width: int, fov_horizontal_deg: float = 70.0) -> float:
@@ -224,15 +496,13 @@ def estimate_marker_distance(corner, frame_width: int, fov_horizontal_deg: float
     Utilise la taille connue du tag (10cm) et la géométrie de la caméra.
     """
     # Taille du marker en pixels (moyenne des côtés)
-    pts = corner[0]
-    side1 = np.linalg.norm(pts[0] - pts[1])
-    side2 = np.linalg.norm(pts[1] - pts[2])
+    (x0, y0), (x1, y1), (x2, y2), _ = np.reshape(corner, (4, 2)).tolist()
+    side1 = math.hypot(x0 - x1, y0 - y1)
+    side2 = math.hypot(x1 - x2, y1 - y2)
     marker_size_pixels = (side1 + side2) / 2
 
     # Calcul de la distance via la géométrie
-    # focal_length (en pixels) ≈ (frame_width / 2) / tan(fov/2)
-    fov_rad = np.radians(fov_horizontal_deg)
-    focal_length = (frame_width / 2) / np.tan(fov_rad / 2)
+    focal_length, _ = _camera_consts(frame_width, fov_horizontal_deg)
 
     # distance = (taille_réelle * focal_length) / taille_pixels
     distance = (TAG_SIZE_M * focal_length) / marker_size_pixels
@@ -247,96 +517,173 @@ def estimate_marker_angle(corner, frame_width: int, fov_horizontal_deg: float =
     Returns:
         Angle en radians (positif = droite, négatif = gauche)
     """
-    pts = corner[0]
-    center_x = np.mean(pts[:, 0])
+    (x0, _), (x1, _), (x2, _), (x3, _) = np.reshape(corner, (4, 2)).tolist()
+    center_x = (x0 + x1 + x2 + x3) * 0.25
 
     # Normaliser entre -1 et 1
     normalized_x = (center_x - frame_width / 2) / (frame_width / 2)
 
     # Convertir en angle
-    fov_rad = np.radians(fov_horizontal_deg)
-    angle = normalized_x * (fov_rad / 2)
+    _, half_fov = _camera_consts(frame_width, fov_horizontal_deg)
+    angle = normalized_x * half_fov
 
     return angle
 
 
+def estimate_markers_distance_angle(
+    corners,
+    frame_width: int,
+    fov_horizontal_deg: float = 70.0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Estime en une passe la distance et l'angle de plusieurs markers.
+
+    Args:
+        corners: coins de K markers, tableau (K, 4, 2) tel que retourné par
+            detect_aruco_markers (ou liste de (1, 4, 2) au format OpenCV)
+
+    Returns:
+        (distances en mètres, angles en radians), tableaux (K,)
+    """
+    pts = np.asarray(corners, dtype=np.float64).reshape(-1, 4, 2)
+
+    # Taille des markers en pixels (moyenne des deux premiers côtés)
+    sides = np.linalg.norm(pts[:, [0, 1]] - pts[:, [1, 2]], axis=-1)
+    marker_size_pixels = sides.mean(axis=1)
+
+    focal_length, half_fov = _camera_consts(frame_width, fov_horizontal_deg)
+    distances = (TAG_SIZE_M * focal_length) / marker_size_pixels
+
+    half_width = frame_width / 2
+    center_x = pts[:, :, 0].mean(axis=1)
+    angles = (center_x - half_width) / half_width * half_fov
+
+    return distances, angles
+
+
 # =============================================================================
 # Trajectoire
 # =============================================================================
 
-def compute_trajectory_from_motor(motor_df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+def integrate_trajectory(
+    dt: np.ndarray,
+    speeds: np.ndarray,
+    yaw_rate: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Intègre (vitesse, taux de rotation) en trajectoire (x, y, yaw).
+
+    L'échantillon 0 est l'origine; le yaw et la position de l'échantillon i
+    utilisent la vitesse et le taux de rotation de l'échantillon i.
+
+    Les incréments et le cos/sin sont calculés en float32 (largement assez
+    pour des mesures capteur), les sommes cumulées restent en float64 pour
+    ne pas dériver sur les longs enregistrements.
+
+    Args:
+        dt: pas de temps de chaque échantillon (secondes)
+        speeds: vitesse (m/s)
+        yaw_rate: taux de rotation (rad/s)
+
+    Returns:
+        (x_positions, y_positions, yaw_angles)
+    """
+    dt = np.asarray(dt, dtype=np.float32)
+
+    yaw_steps = np.asarray(yaw_rate, dtype=np.float32) * dt
+    yaw_steps[:1] = 0.0
+    yaw = np.cumsum(yaw_steps, dtype=np.float64)
+    yaw_f32 = yaw.astype(np.float32)
+
+    step = np.asarray(speeds, dtype=np.float32) * dt
+    step[:1] = 0.0
+    x = np.cumsum(step * np.cos(yaw_f32), dtype=np.float64)
+    y = np.cumsum(step * np.sin(yaw_f32), dtype=np.float64)
+
+    return x, y, yaw
+
+
+def motor_dt(motor_times: np.ndarray) -> np.ndarray:
+    """
+    Pas de temps de chaque échantillon de motor.csv (secondes).
+
+    Le premier pas reprend le second (0.01 s s'il n'y a qu'un échantillon).
+    Peut être calculé une fois et passé aux fonctions compute_trajectory_*
+    (qui ne le modifient pas).
+    """
+    dt = np.diff(motor_times, prepend=0)
+    dt[0] = dt[1] if len(dt) > 1 else 0.01
+    return dt
+
+
+def compute_trajectory_from_motor(
+    motor_df: pd.DataFrame,
+    dt: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Calcule la trajectoire (x, y, yaw) à partir des données motor.csv.
 
     Intègre la vitesse et la direction pour obtenir la position.
 
+    Args:
+        motor_df: données motor.csv
+        dt: pas de temps déjà calculés par motor_dt (optionnel)
+
     Returns:
         (x_positions, y_positions, yaw_angles) - arrays de même taille que motor_df
     """
-    n = len(motor_df)
-    x = np.zeros(n)
-    y = np.zeros(n)
-    yaw = np.zeros(n)
+    # Colonnes extraites une seule fois en tableaux contigus
+    speeds = np.ascontiguousarray(motor_df["speed_ms"].to_numpy())
+    direction_deg = np.ascontiguousarray(motor_df["direction_angle_deg"].to_numpy())
 
-    dt = np.diff(motor_df["seconds_elapsed"].values, prepend=0)
-    dt[0] = dt[1] if n > 1 else 0.01
+    if dt is None:
+        dt = motor_dt(motor_df["seconds_elapsed"].to_numpy())
 
-    speeds = motor_df["speed_ms"].values
     # Direction en rad/s (approximation depuis l'angle)
     # direction_angle_deg donne l'angle de braquage, on le convertit en taux de rotation
     # En supposant que l'angle de braquage est proportionnel au taux de rotation
-    direction_rad = np.radians(motor_df["direction_angle_deg"].values)
+    direction_rad = direction_deg * _DEG2RAD
 
-    for i in range(1, n):
-        # Mettre à jour le yaw (direction)
-        # Le taux de rotation dépend de la vitesse et de l'angle de braquage
-        # Approximation simplifiée: yaw_rate ≈ (speed / wheelbase) * tan(steering_angle)
-        # On utilise une approximation plus simple: yaw_rate proportionnel à direction
-        yaw_rate = direction_rad[i] * 0.5  # Facteur empirique
-        yaw[i] = yaw[i-1] + yaw_rate * dt[i]
+    # Mettre à jour le yaw (direction)
+    # Le taux de rotation dépend de la vitesse et de l'angle de braquage
+    # Approximation simplifiée: yaw_rate ≈ (speed / wheelbase) * tan(steering_angle)
+    # On utilise une approximation plus simple: yaw_rate proportionnel à direction
+    yaw_rate = direction_rad * 0.5  # Facteur empirique
 
-        # Mettre à jour la position
-        speed = speeds[i]
-        x[i] = x[i-1] + speed * np.cos(yaw[i]) * dt[i]
-        y[i] = y[i-1] + speed * np.sin(yaw[i]) * dt[i]
-
-    return x, y, yaw
+    return integrate_trajectory(dt, speeds, yaw_rate)
 
 
-def compute_trajectory_from_gyro(gyro_df: pd.DataFrame, motor_df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+def compute_trajectory_from_gyro(
+    gyro_times: np.ndarray,
+    gyro_yaw_rate: np.ndarray,
+    motor_df: pd.DataFrame,
+    dt: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Calcule la trajectoire en utilisant le gyroscope pour l'orientation.
 
     Plus précis que compute_trajectory_from_motor car utilise directement
     le taux de rotation mesuré.
 
+    Args:
+        gyro_times: timestamps du gyroscope (secondes), normalisés par
+            l'appelant pour commencer à 0 comme motor.csv
+        gyro_yaw_rate: taux de rotation en yaw (axe Y en position verticale), rad/s
+        motor_df: données motor.csv
+        dt: pas de temps déjà calculés par motor_dt (optionnel)
+
     Returns:
         (x_positions, y_positions, yaw_angles)
     """
-    # Interpoler gyro sur les timestamps de motor
-    gyro_y = np.interp(
-        motor_df["seconds_elapsed"].values,
-        gyro_df["seconds_elapsed"].values - gyro_df["seconds_elapsed"].values[0],  # Normaliser à 0
-        gyro_df["y"].values  # Y = yaw en position verticale
-    )
-
-    n = len(motor_df)
-    x = np.zeros(n)
-    y = np.zeros(n)
-    yaw = np.zeros(n)
-
-    dt = np.diff(motor_df["seconds_elapsed"].values, prepend=0)
-    dt[0] = dt[1] if n > 1 else 0.01
+    # Colonnes extraites une seule fois en tableaux contigus
+    motor_times = np.ascontiguousarray(motor_df["seconds_elapsed"].to_numpy())
+    speeds = np.ascontiguousarray(motor_df["speed_ms"].to_numpy())
 
-    speeds = motor_df["speed_ms"].values
-
-    for i in range(1, n):
-        # Intégrer le gyroscope pour le yaw
-        yaw[i] = yaw[i-1] + gyro_y[i] * dt[i]
+    # Interpoler gyro sur les timestamps de motor
+    gyro_y = np.interp(motor_times, gyro_times, gyro_yaw_rate)
 
-        # Mettre à jour la position
-        speed = speeds[i]
-        x[i] = x[i-1] + speed * np.cos(yaw[i]) * dt[i]
-        y[i] = y[i-1] + speed * np.sin(yaw[i]) * dt[i]
+    if dt is None:
+        dt = motor_dt(motor_times)
 
-    return x, y, yaw
+    # Intégrer le gyroscope pour le yaw
+    return integrate_trajectory(dt, speeds, gyro_y)